@@ -1,54 +1,426 @@
 #!/usr/bin/env python
 
 import requests
+import codecs
 import collections
 import argparse
+import hashlib
+import json
+import os
+import re
+import shlex
 
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
-def get_failing_tests_by_block(base_url):
+# Only request the fields needed to find the failing tests, the report of a build being huge otherwise
+TEST_REPORT_TREE = 'suites[enclosingBlocks,cases[className,name,status]]'
+CHUNK_SIZE = 64 * 1024
+# Characters which can follow a value in a JSON document
+VALUE_DELIMITERS = ',:]} \t\r\n'
+PASSING_STATUSES = ('PASSED', 'SKIPPED', 'FIXED')
+MAX_CONCURRENT_REQUESTS = 8
+# Test selection options removed from the stage commands when merging them
+TEST_SELECTION_OPTIONS = ('-Dtest=', '-Dit.test=')
+# Default names of the integration test classes run by Failsafe instead of Surefire
+INTEGRATION_TEST_PATTERN = re.compile(r'^IT|IT$|ITCase$')
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'xwiki-failing-tests')
+METHOD_PATTERN = re.compile(r'^([A-Za-z_$][\w$]*)(\(.*\))?$')
+
+
+class FailingTest(collections.namedtuple('FailingTest', ['class_name', 'name'])):
+    def __str__(self):
+        return self.class_name + '.' + self.name
+
+
+class JsonStream:
+    """Incremental reader of a JSON document received by chunks, to parse it without loading it entirely"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ''
+        self.position = 0
+        self.decoder = json.JSONDecoder()
+
+    def read_more(self):
+        # Forget the text already parsed before adding the next chunk
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\r\n':
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                raise ValueError('Unexpected end of JSON document')
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError('Expected {} at position {} of JSON buffer'.format(character, self.position))
+        self.position += 1
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number could continue in the next chunk (e.g. 1500 followed by .25), so a value is only complete
+                # once it's followed by a delimiter
+                if end < len(self.buffer) and self.buffer[end] in VALUE_DELIMITERS:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                pass
+            if not self.read_more():
+                value, self.position = self.decoder.raw_decode(self.buffer, self.position)
+                return value
+
+    def read_separator(self, end_character):
+        """Read the separator following a value, returning False at the end of the object or array"""
+        character = self.peek()
+        self.position += 1
+        if character == ',':
+            return True
+        if character == end_character:
+            return False
+        raise ValueError('Unexpected {} at position {} of JSON buffer'.format(character, self.position - 1))
+
+    def read_object(self):
+        """Iterate on the keys of an object, the caller having to read the value of each key"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            if not self.read_separator('}'):
+                return
+
+    def read_array(self):
+        """Iterate on the elements of an array, the caller having to read each element"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield
+            if not self.read_separator(']'):
+                return
+
+
+def read_text_chunks(response):
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+def create_session(pool_size=MAX_CONCURRENT_REQUESTS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_failing_tests_by_block(base_url, session=requests):
     url = base_url + '/testReport/api/json'
-    response = requests.get(url)
-    data = response.json()
-    failing_tests_by_block = collections.defaultdict(list)
-    for suite in data['suites']:
-        for case in suite['cases']:
-            if case['status'] != 'PASSED' and case['status'] != 'SKIPPED' and case['status'] != 'FIXED':
-                failing_tests_by_block[suite['enclosingBlocks'][0]].append(case['className'] + '.' + case['name'])
+    # The report is parsed while it's received, keeping only the failing tests
+    with session.get(url, params={'tree': TEST_REPORT_TREE}, stream=True) as response:
+        response.raise_for_status()
+        stream = JsonStream(read_text_chunks(response))
+        failing_tests_by_block = collections.defaultdict(list)
+        for key in stream.read_object():
+            if key != 'suites':
+                stream.read_value()
+                continue
+            for _ in stream.read_array():
+                enclosing_blocks = None
+                failing_tests = []
+                for suite_key in stream.read_object():
+                    if suite_key == 'cases':
+                        for _ in stream.read_array():
+                            case = stream.read_value()
+                            if case['status'] not in PASSING_STATUSES:
+                                failing_tests.append(FailingTest(case['className'], case['name']))
+                    elif suite_key == 'enclosingBlocks':
+                        enclosing_blocks = stream.read_value()
+                    else:
+                        stream.read_value()
+                if failing_tests:
+                    failing_tests_by_block[enclosing_blocks[0]].extend(failing_tests)
 
     return failing_tests_by_block
 
 
-def get_maven_commands(base_url, failing_tests_by_block):
-    maven_commands = []
-
-    # Get information about the build to get the blocks with failures
-    for block in failing_tests_by_block.keys():
+def describe_blocks(base_url, blocks, session=requests, jobs=MAX_CONCURRENT_REQUESTS):
+    def describe(block):
         url = base_url + '/execution/node/' + block + '/wfapi/describe'
-        response = requests.get(url)
-        data = response.json()
-        stages = data['stageFlowNodes']
-        for stage in stages:
+        return session.get(url).json()
+
+    with ThreadPoolExecutor(jobs) as executor:
+        return list(executor.map(describe, blocks))
+
+
+def get_failing_stages(base_url, failing_tests_by_block, session=requests, jobs=MAX_CONCURRENT_REQUESTS):
+    """Get the (stage name, Maven command, failing tests) of each failing block, describing the blocks concurrently"""
+    blocks = list(failing_tests_by_block.keys())
+    descriptions = describe_blocks(base_url, blocks, session, jobs)
+
+    failing_stages = []
+    for block, data in zip(blocks, descriptions):
+        for stage in data['stageFlowNodes']:
             # Check if the parameter description starts with "mvn "
             if stage['parameterDescription'].startswith('mvn '):
-                print("Failing stage: " + data['name'])
-                print("Failing tests:")
-                for test in failing_tests_by_block[block]:
-                    print('  -', test)
-                print('Maven command: ')
-                print(stage['parameterDescription'])
-                print()
-                maven_commands.append(stage['parameterDescription'])
+                failing_stages.append((data['name'], stage['parameterDescription'], failing_tests_by_block[block]))
+    return failing_stages
+
+
+def get_maven_commands(base_url, failing_tests_by_block, session=requests, jobs=MAX_CONCURRENT_REQUESTS):
+    maven_commands = []
+
+    # Get information about the build to get the blocks with failures
+    for name, command, tests in get_failing_stages(base_url, failing_tests_by_block, session, jobs):
+        print("Failing stage: " + name)
+        print("Failing tests:")
+        for test in tests:
+            print('  -', test)
+        print('Maven command: ')
+        print(command)
+        print()
+        maven_commands.append(command)
+
+    return maven_commands
+
+
+def get_module(arguments):
+    for index, argument in enumerate(arguments):
+        if argument in ('-pl', '--projects') and index + 1 < len(arguments):
+            return arguments[index + 1]
+        if argument.startswith('-pl') and len(argument) > 3:
+            return argument[3:]
+        if argument.startswith('--projects='):
+            return argument[len('--projects='):]
+    return '.'
+
+
+def is_integration_test(test):
+    return INTEGRATION_TEST_PATTERN.search(test.class_name.rsplit('.', 1)[-1]) is not None
+
+
+def get_test_filter(tests):
+    """Get the Surefire (or Failsafe) -Dtest value selecting exactly the given tests, by fully qualified class name"""
+    methods_by_class = collections.OrderedDict()
+    for test in tests:
+        class_name = test.class_name
+        match = METHOD_PATTERN.match(test.name)
+        methods = methods_by_class.setdefault(class_name, [])
+        # Run the whole class when the test is not identified by a method name (e.g. parameterized tests)
+        if not match or methods is None:
+            methods_by_class[class_name] = None
+        elif match.group(1) not in methods:
+            methods.append(match.group(1))
+    return ','.join(class_name + ('#' + '+'.join(methods) if methods else '')
+                    for class_name, methods in methods_by_class.items())
+
+
+def get_test_selection_options(tests):
+    """Get the options running only the given tests, with Failsafe for the integration tests"""
+    unit_tests = [test for test in tests if not is_integration_test(test)]
+    integration_tests = [test for test in tests if is_integration_test(test)]
+    options = ()
+    if unit_tests:
+        options += ('-Dtest=' + get_test_filter(unit_tests), '-Dsurefire.failIfNoSpecifiedTests=false')
+    if integration_tests:
+        options += ('-Dit.test=' + get_test_filter(integration_tests), '-Dit.failIfNoSpecifiedTests=false')
+    return options
+
+
+def get_merged_maven_commands(base_url, failing_tests_by_block, session=requests, jobs=MAX_CONCURRENT_REQUESTS):
+    """
+    Get one Maven command for each distinct failing stage command, running only the failing tests of the stages
+    sharing this command.
+    """
+    merged_stages = collections.OrderedDict()
+    for name, command, tests in get_failing_stages(base_url, failing_tests_by_block, session, jobs):
+        arguments = [argument for argument in shlex.split(command) if not argument.startswith(TEST_SELECTION_OPTIONS)]
+        names, merged_tests = merged_stages.setdefault(tuple(arguments), ([], []))
+        if name not in names:
+            names.append(name)
+        merged_tests.extend(test for test in tests if test not in merged_tests)
+
+    maven_commands = []
+    for arguments, (names, tests) in sorted(merged_stages.items(), key=lambda item: get_module(item[0])):
+        command = ' '.join(shlex.quote(argument) for argument in arguments + get_test_selection_options(tests))
+        print("Module: " + get_module(arguments))
+        print("Failing stages: " + ', '.join(names))
+        print("Failing tests:")
+        for test in tests:
+            print('  -', test)
+        print('Maven command: ')
+        print(command)
+        print()
+        maven_commands.append(command)
 
     return maven_commands
 
 
+def get_cache_file(cache_directory, url, suffix=''):
+    return os.path.join(cache_directory, hashlib.sha1(url.rstrip('/').encode('utf-8')).hexdigest() + suffix + '.json')
+
+
+def get_build_failures(build_url, cache_directory, session=requests, jobs=MAX_CONCURRENT_REQUESTS):
+    """
+    Get the failing tests of a completed build by stage name, or None if it has no test report. The answer is kept in
+    the cache directory so that the build is never requested again.
+    """
+    cache_file = get_cache_file(cache_directory, build_url)
+    if os.path.isfile(cache_file):
+        with open(cache_file, 'r') as f:
+            return json.load(f)['failures']
+
+    try:
+        failing_tests_by_block = get_failing_tests_by_block(build_url, session)
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 404:
+            raise
+        failures = None
+    else:
+        blocks = list(failing_tests_by_block.keys())
+        failures = collections.defaultdict(list)
+        for block, data in zip(blocks, describe_blocks(build_url, blocks, session, jobs)):
+            failures[data['name']].extend(str(test) for test in failing_tests_by_block[block])
+
+    os.makedirs(cache_directory, exist_ok=True)
+    with open(cache_file + '.tmp', 'w') as f:
+        json.dump({'url': build_url, 'failures': failures}, f)
+    os.replace(cache_file + '.tmp', cache_file)
+    return failures
+
+
+class FlakinessIndex:
+    """Build numbers in which each test failed, by stage, for the builds of a job already analyzed"""
+
+    def __init__(self, cache_directory, job_url):
+        self.file_name = get_cache_file(cache_directory, job_url, '-index')
+        self.job_url = job_url
+        # Build number (as string, like in JSON) -> whether the build has a test report
+        self.builds = {}
+        # Stage name -> test -> build numbers
+        self.failures = {}
+        if os.path.isfile(self.file_name):
+            with open(self.file_name, 'r') as f:
+                data = json.load(f)
+            self.builds = data['builds']
+            self.failures = data['failures']
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.file_name), exist_ok=True)
+        with open(self.file_name + '.tmp', 'w') as f:
+            json.dump({'job': self.job_url, 'builds': self.builds, 'failures': self.failures}, f)
+        os.replace(self.file_name + '.tmp', self.file_name)
+
+    def add_build(self, number, failures):
+        self.builds[str(number)] = failures is not None
+        for stage, tests in (failures or {}).items():
+            for test in tests:
+                numbers = self.failures.setdefault(stage, {}).setdefault(test, [])
+                if number not in numbers:
+                    numbers.append(number)
+
+    def classify(self, numbers):
+        """
+        Get the (regressions, flaky tests, fixed tests) of the given builds, as lists of (stage, test, failing builds).
+        A regression only failed in the last builds, a flaky test failed and passed several times and a fixed test
+        stopped failing.
+        """
+        numbers = sorted(number for number in numbers if self.builds.get(str(number)))
+        regressions, flaky_tests, fixed_tests = [], [], []
+        for stage, tests in sorted(self.failures.items()):
+            for test, failing_numbers in sorted(tests.items()):
+                failing = [number in failing_numbers for number in numbers]
+                if not any(failing):
+                    continue
+                streaks = sum(1 for index, value in enumerate(failing)
+                              if value and (index == 0 or not failing[index - 1]))
+                entry = (stage, test, [number for number in numbers if number in failing_numbers])
+                if streaks > 1:
+                    flaky_tests.append(entry)
+                elif failing[-1]:
+                    regressions.append(entry)
+                else:
+                    fixed_tests.append(entry)
+        flaky_tests.sort(key=lambda entry: -len(entry[2]))
+        return regressions, flaky_tests, fixed_tests
+
+
+def get_last_builds(job_url, count, session=requests):
+    """Get the (number, URL) of the last completed builds of the job"""
+    url = job_url.rstrip('/') + '/api/json'
+    response = session.get(url, params={'tree': 'builds[number,url,building]{0,%d}' % (count + 1)})
+    response.raise_for_status()
+    builds = [(build['number'], build['url']) for build in response.json()['builds'] if not build.get('building')]
+    return builds[:count]
+
+
+def analyze_flakiness(job_url, count, cache_directory=DEFAULT_CACHE_DIRECTORY, session=requests,
+                      jobs=MAX_CONCURRENT_REQUESTS):
+    """Add the last builds of the job missing from its index and print the regressions and flaky tests"""
+    index = FlakinessIndex(cache_directory, job_url)
+    builds = get_last_builds(job_url, count, session)
+    for number, build_url in builds:
+        if str(number) not in index.builds:
+            print('Analyzing build #%d...' % number)
+            index.add_build(number, get_build_failures(build_url.rstrip('/'), cache_directory, session, jobs))
+    index.save()
+
+    numbers = [number for number, _ in builds]
+    reported_numbers = [number for number in numbers if index.builds.get(str(number))]
+    regressions, flaky_tests, fixed_tests = index.classify(numbers)
+    print()
+    print('Builds with a test report: %d of %d' % (len(reported_numbers), len(numbers)))
+    for title, entries in (('New regressions', regressions), ('Likely flaky tests', flaky_tests),
+                           ('Fixed tests or one-off failures', fixed_tests)):
+        print()
+        print('%s (%d):' % (title, len(entries)))
+        for stage, test, failing_numbers in entries:
+            print('  - %s [%s]: failed in %d of %d builds (%s)' % (test, stage, len(failing_numbers),
+                                                                  len(reported_numbers),
+                                                                  ', '.join('#%d' % n for n in failing_numbers)))
+
+
 if __name__ == '__main__':
     # Get the build URL from the command line
     parser = argparse.ArgumentParser(description='Get failing tests from a Jenkins build')
-    parser.add_argument('build_url', help='The URL of the Jenkins build')
+    parser.add_argument('build_url', help='The URL of the Jenkins build (or of the job with --history)')
+    parser.add_argument('-m', '--merge', action='store_true',
+                        help='Merge the stages running the same Maven command and only run their failing tests')
+    parser.add_argument('-j', '--jobs', type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help='Maximum number of concurrent requests to Jenkins (default is %(default)s)')
+    parser.add_argument('--history', metavar='N', type=int,
+                        help='Find the regressions and flaky tests of the last N builds of the job')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIRECTORY,
+                        help='Directory of the failing tests of the builds already analyzed (default is %(default)s)')
     args = parser.parse_args()
     base_url = args.build_url
+    session = create_session(args.jobs)
+
+    if args.history:
+        analyze_flakiness(base_url, args.history, args.cache_dir, session, args.jobs)
+        parser.exit()
 
-    failing_tests_by_block = get_failing_tests_by_block(base_url)
-    maven_commands = get_maven_commands(base_url, failing_tests_by_block)
+    failing_tests_by_block = get_failing_tests_by_block(base_url, session)
+    if args.merge:
+        maven_commands = get_merged_maven_commands(base_url, failing_tests_by_block, session, args.jobs)
+    else:
+        maven_commands = get_maven_commands(base_url, failing_tests_by_block, session, args.jobs)
     print('\n'.join(maven_commands))
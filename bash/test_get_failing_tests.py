@@ -0,0 +1,52 @@
+## Tests of get-failing-tests.py (run with python3 -m unittest test_get_failing_tests).
+
+import importlib.util
+import os
+import unittest
+
+spec = importlib.util.spec_from_file_location('get_failing_tests',
+                                              os.path.join(os.path.dirname(__file__), 'get-failing-tests.py'))
+get_failing_tests = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(get_failing_tests)
+
+DOCUMENT = '{"a": 1500.25, "b": 12e3, "c": [-7, true, null, "x,y"], "d": {"e": 0.5}, "f": 42}'
+
+
+def read_document(stream):
+    values = {}
+    for key in stream.read_object():
+        if key == 'c':
+            values[key] = [stream.read_value() for _ in stream.read_array()]
+        else:
+            values[key] = stream.read_value()
+    return values
+
+
+class JsonStreamTest(unittest.TestCase):
+    def test_whole_document(self):
+        stream = get_failing_tests.JsonStream([DOCUMENT])
+        self.assertEqual(read_document(stream), {'a': 1500.25, 'b': 12e3, 'c': [-7, True, None, 'x,y'],
+                                                 'd': {'e': 0.5}, 'f': 42})
+
+    def test_one_character_per_chunk(self):
+        stream = get_failing_tests.JsonStream(iter(DOCUMENT))
+        self.assertEqual(read_document(stream), {'a': 1500.25, 'b': 12e3, 'c': [-7, True, None, 'x,y'],
+                                                 'd': {'e': 0.5}, 'f': 42})
+
+    def test_number_at_end_of_document(self):
+        stream = get_failing_tests.JsonStream(iter('12.5e1'))
+        self.assertEqual(stream.read_value(), 125.0)
+
+
+class TestSelectionTest(unittest.TestCase):
+    def test_integration_tests_selected_with_failsafe(self):
+        FailingTest = get_failing_tests.FailingTest
+        tests = [FailingTest('org.a.FooTest', 'x'), FailingTest('org.b.FooTest', 'y'), FailingTest('org.a.FooTest', 'z'),
+                 FailingTest('org.c.PageIT', 'edit()'), FailingTest('org.c.PageIT', '[1] view')]
+        self.assertEqual(get_failing_tests.get_test_selection_options(tests),
+                         ('-Dtest=org.a.FooTest#x+z,org.b.FooTest#y', '-Dsurefire.failIfNoSpecifiedTests=false',
+                          '-Dit.test=org.c.PageIT', '-Dit.failIfNoSpecifiedTests=false'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Apply the translation files of the master branch to another branch of the projects, as the update target of
+## apply_translations.sh did for each project: the components of all the projects are retrieved at once, their
+## language files are resolved from the tree of master and restored with a single checkout per project, and the
+## projects are updated concurrently.
+
+import argparse
+import fnmatch
+import os
+import posixpath
+import re
+import subprocess
+import sys
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from retrieve_components import retrieve_components, ComponentManifest, WEBLATE_REST_API_URL, DEFAULT_MANIFEST_FILE
+from translation_authors import AuthorIndex
+
+PROJECTS = ["xwiki-commons", "xwiki-rendering", "xwiki-platform"]
+SOURCE_BRANCH = "master"
+# Same file as the one read by the commit target of apply_translations.sh
+AUTHORS_FILE = "/tmp/xwiki-translations-authors_%s_%s.txt"
+WILDCARDS = ('*', '?', '[')
+
+def get_version_pattern(branch):
+    """Get the pattern of the tags of the branch (e.g. *-16.10* for stable-16.10.x)"""
+    return re.sub(r'.x', '*', branch, count=1).replace('stable', '*', 1)
+
+def match_segment(part, segment):
+    """Check if the path segment matches the glob segment, where wildcards don't match a leading dot"""
+    if part.startswith('.') and not segment.startswith('.'):
+        return False
+    return fnmatch.fnmatchcase(part, segment)
+
+def match_glob(pattern, files_by_directory):
+    """Get the files matching the shell glob, where wildcards don't match slashes"""
+    directory, name = posixpath.split(pattern)
+    if not any(wildcard in directory for wildcard in WILDCARDS):
+        return [file_name for file_name in files_by_directory.get(directory, [])
+                if match_segment(posixpath.basename(file_name), name)]
+    segments = pattern.split('/')
+    return [file_name for file_names in files_by_directory.values() for file_name in file_names
+            if len(file_name.split('/')) == len(segments)
+            and all(match_segment(part, segment) for part, segment in zip(file_name.split('/'), segments))]
+
+def resolve_files(entries, tracked_files):
+    """Get the template and the language files of the components whose template is in the tree"""
+    files_by_directory = defaultdict(list)
+    for file_name in tracked_files:
+        files_by_directory[posixpath.dirname(file_name)].append(file_name)
+    files = []
+    for entry in entries:
+        if entry["template"] in tracked_files:
+            files.append(entry["template"])
+            if entry["languages"]:
+                files.extend(sorted(match_glob(entry["languages"], files_by_directory)))
+    return files
+
+class ProjectUpdate(object):
+    """Update of the translations of the working tree of a project, its output being displayed once done"""
+    def __init__(self, directory, branch):
+        self.directory = directory
+        self.name = os.path.basename(os.path.abspath(directory))
+        self.branch = branch
+        self.output = []
+
+    def log(self, message):
+        self.output.append(message)
+
+    def git(self, *arguments, **kwargs):
+        """Run the git command in the working tree, logging its output, and tell if it succeeded"""
+        process = subprocess.run(['git', '-C', self.directory] + list(arguments), stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, **kwargs)
+        output = process.stdout.decode('utf-8', errors='replace').rstrip('\n')
+        if output:
+            self.log(output)
+        return process.returncode == 0
+
+    def read_git(self, *arguments):
+        """Get the output of the git command run in the working tree"""
+        process = subprocess.run(['git', '-C', self.directory] + list(arguments), stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL)
+        return process.stdout.decode('utf-8', errors='replace')
+
+    def compute_authors(self, since, entries, tracked_files):
+        """Append the authors of the translation files since the date to the file used for the commit"""
+        index = AuthorIndex()
+        index.load(since, self.directory)
+        with open(AUTHORS_FILE % (self.branch, self.name), 'a') as authors_file:
+            for entry in entries:
+                if entry["template"] in tracked_files:
+                    for pattern in [entry["template"]] + ([entry["languages"]] if entry["languages"] else []):
+                        for line in index.get_authors(pattern):
+                            authors_file.write(line + '\n')
+
+    def run(self, entries):
+        """Restore the translation files of the source branch in the branch, and tell if it succeeded"""
+        # Ensure that all commits from master are retrieved, since we'll update from it.
+        self.git('checkout', SOURCE_BRANCH)
+        self.git('pull', '--rebase', 'origin', SOURCE_BRANCH)
+        # Find latest tag related to the branch
+        tags = self.read_git('tag', '-l', '--sort=-taggerdate', get_version_pattern(self.branch)).split()
+        tag = tags[0] if tags else ''
+        self.log("Latest tag found: %s" % tag)
+
+        ## We resolve the translation files available in master, since it's those that we will commit back.
+        tracked_files = set(self.read_git('ls-tree', '-r', '-z', '--name-only', 'HEAD').split('\0'))
+        tracked_files.discard('')
+        files = resolve_files(entries, tracked_files)
+        tag_date = self.read_git('log', '-1', '--format=%ai', tag).strip() if tag else ''
+        if tag_date:
+            self.compute_authors(tag_date, entries, tracked_files)
+        else:
+            self.log("Warning: no tag date, the co-authors are not computed")
+
+        if not self.git('checkout', self.branch):
+            self.log("Branch %s not found." % self.branch)
+            return False
+        if not self.git('pull', '--rebase', 'origin', self.branch):
+            self.log("Couldn't pull new changes.")
+            return False
+        # Apply all the files to the current branch at once
+        if files:
+            pathspecs = ''.join(file_name + '\0' for file_name in files).encode('utf-8')
+            return self.git('--literal-pathspecs', 'checkout', SOURCE_BRANCH, '--pathspec-from-file=-',
+                            '--pathspec-file-nul', input=pathspecs)
+        return True
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Apply the translations of the master branch to another branch.')
+    parser.add_argument('branch', help='Branch to update (e.g. stable-16.10.x)')
+    parser.add_argument('directories', metavar='directory', nargs='*', default=PROJECTS,
+                        help='Working trees to update, named after their Weblate project (default is %s)'
+                        % ' '.join(PROJECTS))
+    parser.add_argument('--url', metavar='url', default=WEBLATE_REST_API_URL,
+                        help='Weblate REST API URL (default is %s)' % WEBLATE_REST_API_URL)
+    parser.add_argument('--manifest', metavar='manifest_file', default=DEFAULT_MANIFEST_FILE,
+                        help='Local manifest of the components (default is %s)' % DEFAULT_MANIFEST_FILE)
+    return parser.parse_args()
+
+def main():
+    """Main function"""
+    args = parse_arguments()
+    updates = [ProjectUpdate(directory, args.branch) for directory in args.directories]
+    manifest = ComponentManifest(args.manifest)
+    components = retrieve_components([update.name for update in updates], args.url, manifest=manifest)
+    manifest.save()
+
+    updated = 0
+    failures = []
+    with ThreadPoolExecutor(len(updates)) as executor:
+        futures = {executor.submit(update.run, [entry for entry in components[update.name]
+                                                if entry["branch"] == SOURCE_BRANCH]): update
+                   for update in updates}
+        for future in as_completed(futures):
+            update = futures[future]
+            print("Updating %s translations..." % update.name)
+            try:
+                success = future.result()
+            except Exception as e:
+                update.log("Error: the update failed for the project [%s]: %s" % (update.name, e))
+                failures.append(update.name)
+                success = False
+            print('\n'.join(update.output))
+            print()
+            updated += success
+    print("%d project(s) updated." % updated)
+    if failures:
+        sys.exit('The update failed for the projects: %s' % ', '.join(sorted(failures)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Benchmark of the XmlFile and PropertiesFile operations on generated XWiki translation files of several sizes.
+## The results can be saved as a baseline and later runs compared to it, to catch the performance regressions.
+
+import argparse
+import base64
+import fnmatch
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from collections import namedtuple, OrderedDict
+
+from common import XmlFile, PropertiesFile, FileType
+
+Tier = namedtuple('Tier', ['keys', 'objects', 'attachments', 'attachment_size'])
+Benchmark = namedtuple('Benchmark', ['name', 'setup', 'run'])
+
+TIERS = OrderedDict([
+    ('small', Tier(keys=100, objects=2, attachments=0, attachment_size=0)),
+    ('medium', Tier(keys=1000, objects=10, attachments=2, attachment_size=64 * 1024)),
+    ('large', Tier(keys=10000, objects=50, attachments=5, attachment_size=1024 * 1024)),
+])
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2
+RESULTS_VERSION = 1
+
+PAGE_HEADER = """<?xml version="1.1" encoding="UTF-8"?>
+
+<!--
+ * See the NOTICE file distributed with this work for additional
+ * information regarding copyright ownership.
+-->
+
+<xwikidoc version="1.5" reference="XWiki.Benchmark.Translations" locale="{language}">
+  <web>XWiki.Benchmark</web>
+  <name>Translations</name>
+  <language>{language}</language>
+  <defaultLanguage>en</defaultLanguage>
+  <translation>{translation}</translation>
+  <creator>xwiki:XWiki.Admin</creator>
+  <parent>WebHome</parent>
+  <author>xwiki:XWiki.Admin</author>
+  <version>1.1</version>
+  <title>Benchmark translations</title>
+  <comment/>
+  <minorEdit>false</minorEdit>
+  <syntaxId>plain/1.0</syntaxId>
+  <hidden>true</hidden>
+  <content>{content}</content>
+"""
+ATTACHMENT = """  <attachment>
+    <filename>image{number}.png</filename>
+    <mimetype>image/png</mimetype>
+    <filesize>{size}</filesize>
+    <author>xwiki:XWiki.Admin</author>
+    <version>1.1</version>
+    <comment/>
+    <content>{content}</content>
+  </attachment>
+"""
+OBJECT = """  <object>
+    <name>XWiki.Benchmark.Translations</name>
+    <number>{number}</number>
+    <className>{class_name}</className>
+    <guid>00000000-0000-0000-0000-{number:012d}</guid>
+    <class>
+      <name>{class_name}</name>
+      <customClass/>
+      <customMapping/>
+      <defaultViewSheet/>
+      <defaultEditSheet/>
+      <defaultWeb/>
+      <nameField/>
+      <validationScript/>
+      <scope>
+        <disabled>0</disabled>
+        <name>scope</name>
+        <prettyName>Scope</prettyName>
+        <values>GLOBAL|WIKI|USER|ON_DEMAND</values>
+      </scope>
+    </class>
+    <property>
+      <scope>{scope}</scope>
+    </property>
+  </object>
+"""
+
+def generate_value(rng, number, language):
+    """Generate a value, some of them having MessageFormat parameters (with escaped quotes) or several lines"""
+    words = ' '.join(rng.choice(['wiki', 'page', 'space', 'user', 'group', 'right', 'edit', 'view', 'a', 'the'])
+                     for _ in range(rng.randint(1, 12)))
+    prefix = '[{}] '.format(language) if language else ''
+    kind = number % 10
+    if kind == 0:
+        return prefix + "Can''t save {0} in {1}: " + words
+    if kind == 1:
+        return prefix + words + ' \\\n    ' + words + ' \\\n    ' + words
+    if kind == 2:
+        return prefix + '<strong>{0}</strong> & ' + words
+    return prefix + words
+
+def generate_properties(keys, seed, language='', missing=0.0):
+    """
+    Generate a properties document with comments, deprecated keys and a part that is not translated, the given
+    proportion of the keys being missing.
+    """
+    rng = random.Random('{}-{}'.format(seed, language))
+    lines = ['# ---------------------------------------------------------------------------\n',
+             '# See the NOTICE file distributed with this work for additional\n',
+             '# information regarding copyright ownership.\n',
+             '# ---------------------------------------------------------------------------\n', '\n']
+    deprecated_start = keys - keys // 10
+    untranslated_start = keys - keys // 50
+    for number in range(keys):
+        if number % 100 == 0:
+            lines.append('\n## Section {}\n'.format(number // 100))
+        if number == deprecated_start:
+            lines.append('\n## Used to indicate where deprecated keys start\n#@deprecatedstart\n')
+        if number == untranslated_start:
+            lines.append('#@deprecatedend\n\n## Not translated\nnotranslationsmarker=\n')
+        if language and rng.random() < missing:
+            continue
+        key = 'benchmark.module{}.section{}.key{}'.format(number % 37, number // 100, number)
+        lines.append('{}={}\n'.format(key, generate_value(rng, number, language)))
+    return ''.join(lines)
+
+def escape_xml(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def generate_translation_page(tier, seed, language='', missing=0.0):
+    """Generate a translation page, with its objects and attachments when it's in the default language"""
+    rng = random.Random('{}-page-{}'.format(seed, language))
+    content = generate_properties(tier.keys, seed, language, missing)
+    parts = [PAGE_HEADER.format(language=language, translation=1 if language else 0, content=escape_xml(content))]
+    if not language:
+        for number in range(tier.attachments):
+            data = bytes(rng.getrandbits(8) for _ in range(min(tier.attachment_size, 4096)))
+            if data:
+                data = (data * (tier.attachment_size // len(data) + 1))[:tier.attachment_size]
+            parts.append(ATTACHMENT.format(number=number, size=len(data),
+                                           content=base64.b64encode(data).decode('ascii')))
+        for number in range(tier.objects):
+            class_name = 'XWiki.TranslationDocumentClass' if number == 0 else 'XWiki.Benchmark.Class{}'.format(number)
+            parts.append(OBJECT.format(number=number, class_name=class_name, scope=rng.choice(['WIKI', 'USER'])))
+    parts.append('</xwikidoc>\n')
+    return ''.join(parts)
+
+class Fixtures(object):
+    """Generated files of a tier, written in a temporary directory"""
+    def __init__(self, tier_name, directory):
+        tier = TIERS[tier_name]
+        self.directory = directory
+        self.properties = generate_properties(tier.keys, tier_name)
+        self.translated_properties = generate_properties(tier.keys, tier_name, 'fr', missing=0.1)
+        self.keys = list(load_properties(self.properties).properties)
+        self.page_file = self.write('Translations.xml', generate_translation_page(tier, tier_name))
+        self.written_files = 0
+
+    def write(self, name, document):
+        file_name = os.path.join(self.directory, name)
+        with open(file_name, 'w') as f:
+            f.write(document)
+        return file_name
+
+    def get_output_file(self, extension):
+        """Get a new file name, so that the written documents are never skipped as unchanged"""
+        self.written_files += 1
+        return os.path.join(self.directory, 'output{}.{}'.format(self.written_files, extension))
+
+def load_properties(document):
+    properties = PropertiesFile()
+    properties.load(document)
+    return properties
+
+def load_xml(file_name):
+    xml = XmlFile()
+    xml.load(file_name)
+    return xml
+
+def load_indexed_xml(file_name):
+    xml = load_xml(file_name)
+    xml.get_elements()
+    return xml
+
+def set_values(properties, keys):
+    for key in keys[::10]:
+        properties.set_value(key, 'new value')
+
+def remove_keys(properties, keys):
+    for key in keys[::10]:
+        properties.remove_key(key)
+
+def get_values(properties, keys):
+    for key in keys:
+        properties.get_value(key)
+
+def replace_with(documents):
+    properties, translated_properties = documents
+    properties.replace_with(translated_properties)
+
+def edit_page(xml):
+    with xml.batch():
+        xml.set_tag_content('content', 'benchmark.key=value')
+        xml.set_tag_content('title', 'Benchmark')
+        xml.remove_all_tags('attachment')
+    return xml.document
+
+def has_translation_marker(file_name):
+    with open(file_name, 'rb') as f:
+        return FileType.has_translation_marker(f)
+
+# Each benchmark is set up from the fixtures before each run, only the run being timed
+BENCHMARKS = [
+    Benchmark('properties.load', lambda f: f.properties, load_properties),
+    Benchmark('properties.get_value', lambda f: (load_properties(f.properties), f.keys),
+              lambda state: get_values(*state)),
+    Benchmark('properties.set_value', lambda f: (load_properties(f.properties), f.keys),
+              lambda state: set_values(*state)),
+    Benchmark('properties.remove_key', lambda f: (load_properties(f.properties), f.keys),
+              lambda state: remove_keys(*state)),
+    Benchmark('properties.filter_import', lambda f: load_properties(f.translated_properties),
+              lambda properties: properties.filter_import()),
+    Benchmark('properties.filter_export', lambda f: load_properties(f.translated_properties),
+              lambda properties: properties.filter_export()),
+    Benchmark('properties.replace_with',
+              lambda f: (load_properties(f.properties), load_properties(f.translated_properties)), replace_with),
+    Benchmark('properties.write', lambda f: (load_properties(f.properties), f.get_output_file('properties')),
+              lambda state: state[0].write(state[1])),
+    Benchmark('xml.load', lambda f: f.page_file, load_indexed_xml),
+    Benchmark('xml.get_tag_content', lambda f: load_xml(f.page_file),
+              lambda xml: xml.get_tag_content('content')),
+    Benchmark('xml.get_tag_delimiters', lambda f: load_indexed_xml(f.page_file),
+              lambda xml: [xml.get_tag_delimiters(tag, parents) for tag, parents in
+                           [('content', ['xwikidoc']), ('className', None), ('scope', ['xwikidoc', 'object',
+                                                                                      'property'])] * 100]),
+    Benchmark('xml.set_tag_content', lambda f: load_indexed_xml(f.page_file), edit_page),
+    Benchmark('xml.create_xml_file', lambda f: f.page_file,
+              lambda file_name: XmlFile.create_xml_file(None, file_name, 'fr', write=False)),
+    Benchmark('xml.has_translation_marker', lambda f: f.page_file, has_translation_marker),
+    Benchmark('xml.write', lambda f: (load_xml(f.page_file), f.get_output_file('xml')),
+              lambda state: state[0].write(state[1])),
+]
+
+def time_benchmark(benchmark, fixtures, repeat):
+    """Get the durations of the runs of the benchmark, in seconds"""
+    durations = []
+    for _ in range(repeat):
+        state = benchmark.setup(fixtures)
+        start = time.perf_counter()
+        benchmark.run(state)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def run_benchmarks(tiers, patterns, repeat):
+    """Run the benchmarks matching the patterns on each tier"""
+    results = OrderedDict()
+    for tier_name in tiers:
+        with tempfile.TemporaryDirectory(prefix='weblate-benchmark-') as directory:
+            fixtures = Fixtures(tier_name, directory)
+            for benchmark in BENCHMARKS:
+                if patterns and not any(fnmatch.fnmatchcase(benchmark.name, pattern) for pattern in patterns):
+                    continue
+                durations = time_benchmark(benchmark, fixtures, repeat)
+                name = '{}[{}]'.format(benchmark.name, tier_name)
+                results[name] = {"min": min(durations), "median": statistics.median(durations), "repeat": repeat}
+                print("{:<45} {:>10.2f} ms {:>10.2f} ms".format(name, 1000 * min(durations),
+                                                                1000 * statistics.median(durations)))
+    return results
+
+def compare(results, baseline, threshold):
+    """Display the ratio of the durations to the baseline ones and get the regressed benchmarks"""
+    regressions = []
+    print()
+    print("{:<45} {:>13} {:>13} {:>7}".format("Benchmark", "Baseline", "Current", "Ratio"))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["min"] / baseline[name]["min"] if baseline[name]["min"] else 1.0
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print("{:<45} {:>10.2f} ms {:>10.2f} ms {:>7.2f}{}".format(name, 1000 * baseline[name]["min"],
+                                                                   1000 * result["min"], ratio,
+                                                                   ' REGRESSION' if regressed else ''))
+    return regressions
+
+def read_results(file_name):
+    if not os.path.isfile(file_name):
+        sys.exit('The baseline {} does not exist'.format(file_name))
+    with open(file_name, 'r') as f:
+        results = json.load(f)
+    if results.get("version") != RESULTS_VERSION:
+        sys.exit('The baseline {} has an unsupported format'.format(file_name))
+    return results["results"]
+
+def write_results(file_name, results):
+    with open(file_name, 'w') as f:
+        json.dump({"version": RESULTS_VERSION, "python": platform.python_version(), "machine": platform.machine(),
+                   "results": results}, f, indent=2)
+        f.write('\n')
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark the operations on the translation files.')
+    parser.add_argument('patterns', metavar='pattern', nargs='*', help='Run only the benchmarks matching one of '
+        'the glob patterns (e.g. "xml.*")')
+    parser.add_argument('-t', '--tiers', nargs='+', choices=list(TIERS), default=list(TIERS), help='Sizes of the '
+        'generated files (default is all of them)')
+    parser.add_argument('-r', '--repeat', metavar='N', type=int, default=DEFAULT_REPEAT, help='Number of runs of '
+        'each benchmark (default is {})'.format(DEFAULT_REPEAT))
+    parser.add_argument('-o', '--output', metavar='results_file', help='Write the results in the file, which can '
+        'be used as a baseline')
+    parser.add_argument('-b', '--baseline', metavar='results_file', help='Compare the results to the ones of the '
+        'file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Slowdown of the shortest run '
+        'above which a benchmark is reported as regressed (default is {})'.format(DEFAULT_THRESHOLD))
+    return parser.parse_args()
+
+def main():
+    """Main function"""
+    args = parse_arguments()
+    baseline = read_results(args.baseline) if args.baseline else None
+    print("{:<45} {:>13} {:>13}".format("Benchmark", "Min", "Median"))
+    results = run_benchmarks(args.tiers, args.patterns, args.repeat)
+    if args.output:
+        write_results(args.output, results)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            sys.exit('{} benchmark(s) regressed: {}'.format(len(regressions), ', '.join(regressions)))
+
+if __name__ == '__main__':
+    main()
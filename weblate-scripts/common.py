@@ -18,73 +18,296 @@
 # 02110-1301 USA, or see the FSF site: http://www.fsf.org.
 # ---------------------------------------------------------------------------
 
+import bisect
+import glob
+import locale
 import os
 import re
+import shutil
 
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from string import whitespace
 
 TagDelimiter = namedtuple('TagDelimiter', ['start', 'end'])
+XmlEdit = namedtuple('XmlEdit', ['start', 'end', 'text', 'order'])
+
+class XmlElement(object):
+    """Element of an XML document, located by the delimiters of its tags"""
+    __slots__ = ['name', 'parents', 'open_tag', 'close_tag']
+
+    def __init__(self, name, parents, open_tag, close_tag=None):
+        self.name = name
+        self.parents = parents
+        self.open_tag = open_tag
+        self.close_tag = close_tag
+
+    @property
+    def start(self):
+        return self.open_tag.start
+
+    @property
+    def end(self):
+        return (self.close_tag or self.open_tag).end
+
+    @property
+    def position(self):
+        """Offset at which the element is complete (i.e. the order of the first found tags)"""
+        return (self.close_tag or self.open_tag).start
+
+    def shift(self, delta):
+        """Move the element by delta characters"""
+        self.open_tag = TagDelimiter(self.open_tag.start + delta, self.open_tag.end + delta)
+        self.shift_close(delta)
+
+    def shift_close(self, delta):
+        """Move only the close tag of the element by delta characters"""
+        if self.close_tag:
+            self.close_tag = TagDelimiter(self.close_tag.start + delta, self.close_tag.end + delta)
 
 class XmlFile(object):
     """"Simple class working on XML files"""
-    def __init__(self):
-        self.document = ''
+    # Matches a tag, a comment, a CDATA section or a processing instruction
+    TAG_PATTERN = re.compile(r'<(?:!--.*?-->|!\[CDATA\[.*?\]\]>|[!?][^>]*>|\s*(/?)\s*([^\s/>]+)([^>]*)>)',
+                             re.DOTALL)
 
-    def load(self, file_name):
-        """Read and load the document"""
+    def __init__(self):
+        self._document = ''
+        self._elements = None
+        self._index = None
+        self._edits = []
+        self._batch_level = 0
+        # Tags created in the current batch, by path of their parent
+        self._created_tags = {}
+
+    @property
+    def document(self):
+        """The document, including the pending modifications"""
+        self.commit()
+        return self._document
+
+    @document.setter
+    def document(self, document):
+        self._edits = []
+        self._created_tags = {}
+        self._document = document
+        self._invalidate_index()
+
+    def load(self, file_name, elements=None):
+        """Read and load the document, optionally with its elements when they are already known"""
         with open(file_name, "r") as f_xml:
             self.document = f_xml.read()
+        if elements is not None:
+            self._elements = elements
+            self._update_tag_index()
 
-    def get_tag_delimiters(self, tag, parents=None):
-        """Get the indices of the beginning and end of the tag (first found)"""
-        # If parents = [], then the search is done at the root
-        # If parents = None, then the search is done everywhere
+    @classmethod
+    def tokenize(cls, text, offset=0, parents=()):
+        """
+        Get the elements found in the text, in the order in which they are complete.
+        Return also whether the text is balanced, i.e. all its tags are closed.
+        """
+        elements = []
         tags = []
-        pos = 0
-        while 0 <= pos < len(self.document):
-            pos = self.document.find('<', pos)
-            open_tag = TagDelimiter(pos, self.document.find('>', pos) + 1)
-            pos += 1
-            if not 0 < pos < len(self.document):
-                break
-            if self.document[pos] in '!?':
+        balanced = True
+        for match in cls.TAG_PATTERN.finditer(text):
+            name = match.group(2)
+            if name is None:
                 continue
-            while pos < len(self.document) and self.document[pos] in whitespace:
-                pos += 1
-            closing = False
-            if pos < len(self.document) and self.document[pos] == '/':
-                closing = True
-                pos += 1
-            while pos < len(self.document) and self.document[pos] in whitespace:
-                pos += 1
-            current_tag = ''
-            while pos < len(self.document) and self.document[pos] not in whitespace + '/>':
-                current_tag += self.document[pos]
-                pos += 1
-            if closing:
+            tag = TagDelimiter(match.start() + offset, match.end() + offset)
+            if match.group(1):
                 if not tags:
-                    print ('Warning: Found [{}] as close tag before the start tag'
-                           .format(current_tag))
-                elif current_tag != tags[-1][0]:
+                    print ('Warning: Found [{}] as close tag before the start tag'.format(name))
+                    balanced = False
+                elif name != tags[-1][0]:
                     print ('Warning: Expected [{}] but found [{}] as close tag'
-                           .format(tags[-1], current_tag))
+                           .format(tags[-1][0], name))
+                    balanced = False
                 else:
-                    (_, open_tag), close_tag = tags.pop(), open_tag
-                    if (current_tag == tag and
-                            (parents is None or (tags and list(zip(*tags)[0]) == parents))):
-                        return open_tag, close_tag
+                    _, open_tag = tags.pop()
+                    elements.append(XmlElement(name, parents + tuple(t[0] for t in tags),
+                                               open_tag, tag))
+            elif match.group(3).rstrip().endswith('/'):
+                elements.append(XmlElement(name, parents + tuple(t[0] for t in tags), tag))
             else:
-                if self.document.find('/', pos, open_tag.end) >= 0:
-                    if (current_tag == tag and
-                            (parents is None or (tags and list(zip(*tags)[0]) == parents))):
-                        return open_tag, None
-                else:
-                    tags.append((current_tag, open_tag))
-                pos = open_tag.end
-                while pos < len(self.document) and self.document[pos] in whitespace:
-                    pos += 1
-            pos = self.document.find('<', pos)
+                tags.append((name, tag))
+        return elements, balanced and not tags
+
+    def _build_index(self):
+        """Tokenize the whole document"""
+        self._elements, _ = self.tokenize(self._document)
+        self._update_tag_index()
+
+    def get_elements(self):
+        """Get the elements of the document, in the order in which they are complete"""
+        self.commit()
+        if self._elements is None:
+            self._build_index()
+        return self._elements
+
+    def _invalidate_index(self):
+        """Tokenize the document again on the next lookup"""
+        self._elements = None
+        self._index = None
+
+    def _update_tag_index(self):
+        self._index = {}
+        for element in self._elements:
+            self._index.setdefault(element.name, []).append(element)
+
+    @contextmanager
+    def batch(self):
+        """
+        Record the modifications made in the block and apply them in one pass at the end of it.
+        Inside the block, lookups are done on the document as it was before the modifications.
+        """
+        self._batch_level += 1
+        try:
+            yield self
+        except BaseException:
+            self._edits = []
+            self._created_tags = {}
+            raise
+        finally:
+            self._batch_level -= 1
+        if not self._batch_level:
+            self.commit()
+
+    def _replace(self, start, end, text):
+        """Replace the given part of the document (applied directly if not in a batch)"""
+        self._edits.append(XmlEdit(start, end, text, len(self._edits)))
+        if not self._batch_level:
+            self.commit()
+
+    @staticmethod
+    def _drop_removed_edits(edits):
+        """Drop the edits enclosed in a removed part, whatever their order, keeping the insertions at its bounds"""
+        removals = []
+        for edit in sorted((edit for edit in edits if edit.start < edit.end and not edit.text),
+                           key=lambda edit: (edit.start, -edit.end, edit.order)):
+            if not removals or edit.end > removals[-1].end:
+                removals.append(edit)
+        if not removals:
+            return edits
+        starts = [removal.start for removal in removals]
+        kept = []
+        for edit in edits:
+            index = bisect.bisect_right(starts, edit.start) - 1
+            removal = removals[index] if index >= 0 else None
+            if removal is None or edit is removal or edit.end > removal.end or\
+                    (edit.start == edit.end and edit.start in (removal.start, removal.end)):
+                kept.append(edit)
+        return kept
+
+    @staticmethod
+    def _resolve_edits(edits):
+        """Sort the edits, dropping the ones included in a removed part or in a part replaced later"""
+        resolved = []
+        edits = XmlFile._drop_removed_edits(edits)
+        for edit in sorted(edits, key=lambda edit: (edit.start, edit.end, edit.order)):
+            while resolved and resolved[-1].start == edit.start and resolved[-1].end <= edit.end and\
+                    resolved[-1].start < resolved[-1].end and resolved[-1].order < edit.order:
+                # Same start and included in the current edit, which is more recent
+                resolved.pop()
+            if not resolved or edit.start >= resolved[-1].end:
+                resolved.append(edit)
+            elif edit.end <= resolved[-1].end and edit.order < resolved[-1].order:
+                # Included in a more recent edit
+                continue
+            else:
+                raise ValueError('Overlapping modifications at [{}, {}]'.format(edit.start, edit.end))
+        return resolved
+
+    def _overlaps_pending_edit(self, start, end):
+        """
+        Tell if a modification of the given part can't be resolved with the pending modifications, i.e. if it's
+        in a part that they replace (the ones it encloses or that remove it being resolved)
+        """
+        for edit in self._edits:
+            if edit.start < end and start < edit.end and not (start <= edit.start and edit.end <= end) and\
+                    not (edit.start < edit.end and not edit.text):
+                return True
+        return False
+
+    def _find_tag_to_modify(self, tag, parents=None):
+        """
+        Get the delimiters of the tag to modify, as get_tag_delimiters does.
+        When the tag is in a part replaced earlier in the batch, the pending modifications are applied first and
+        the tag is looked up again, like it would be without batch.
+        """
+        open_tag, close_tag = self.get_tag_delimiters(tag, parents)
+        if open_tag and self._overlaps_pending_edit(open_tag.start, (close_tag or open_tag).end):
+            self.commit()
+            open_tag, close_tag = self.get_tag_delimiters(tag, parents)
+        return open_tag, close_tag
+
+    def commit(self):
+        """Apply the pending modifications in one pass"""
+        self._created_tags = {}
+        if not self._edits:
+            return
+        edits, self._edits = self._edits, []
+        edits = self._resolve_edits(edits)
+        if len(edits) == 1:
+            self._apply_edit(*edits[0][:3])
+            return
+        parts = []
+        position = 0
+        for start, end, text, _ in edits:
+            parts.append(self._document[position:start])
+            parts.append(text)
+            position = end
+        parts.append(self._document[position:])
+        self._document = ''.join(parts)
+        self._invalidate_index()
+
+    def _apply_edit(self, start, end, text):
+        """Replace the given part of the document and update the elements accordingly"""
+        self._document = self._document[:start] + text + self._document[end:]
+        if self._elements is None:
+            return
+        delta = len(text) - (end - start)
+        elements = []
+        enclosing = None
+        for element in self._elements:
+            if element.end <= start:
+                elements.append(element)
+            elif element.start >= end:
+                element.shift(delta)
+                elements.append(element)
+            elif start <= element.start and element.end <= end:
+                # Removed element
+                continue
+            elif element.close_tag and element.open_tag.end <= start and end <= element.close_tag.start:
+                element.shift_close(delta)
+                elements.append(element)
+                if enclosing is None or enclosing.start < element.start:
+                    enclosing = element
+            else:
+                # The modification breaks a tag: fall back to a full scan on the next lookup
+                self._invalidate_index()
+                return
+        parents = enclosing.parents + (enclosing.name,) if enclosing else ()
+        new_elements, balanced = self.tokenize(text, start, parents)
+        if not balanced:
+            self._invalidate_index()
+            return
+        if new_elements:
+            elements.extend(new_elements)
+            elements.sort(key=lambda element: element.position)
+        self._elements = elements
+        self._update_tag_index()
+
+    def get_tag_delimiters(self, tag, parents=None):
+        """Get the indices of the beginning and end of the tag (first found)"""
+        # If parents = [], then the search is done at the root
+        # If parents = None, then the search is done everywhere
+        if self._index is None:
+            self._build_index()
+        for element in self._index.get(tag, []):
+            if parents is None or list(element.parents) == parents:
+                return element.open_tag, element.close_tag
         return None, None
 
     def get_tag_content(self, tag, parents=None):
@@ -92,74 +315,123 @@ class XmlFile(object):
         open_tag, close_tag = self.get_tag_delimiters(tag, parents)
         if open_tag is None or close_tag is None:
             return ""
-        content = self.document[open_tag.end:close_tag.start]
+        content = self._document[open_tag.end:close_tag.start]
         content = content.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
         return content
 
-    def create_tags(self, tag, parents=None):
-        """Create the tag and its parents if it doesn't exists"""
-        # Note that the method is not very optimized but should be fast enough in practice
-        open_tag, _ = self.get_tag_delimiters(tag, parents)
-        if parents:
-            if not open_tag:
-                open_parent_tag, close_parent_tag = self.create_tags(parents[-1], parents[:-1])
-                if close_parent_tag:
-                    self.document = "{}<{} />\n{}".format(
-                        self.document[:close_parent_tag.start], tag,
-                        self.document[close_parent_tag.start:])
-                else:
-                    self.document = "{0}<{1}>\n<{2} />\n</{1}>\n{3}".format(
-                        self.document[:open_parent_tag.start],
-                        parents[-1],
-                        tag,
-                        self.document[open_parent_tag.end:])
+    def _get_created_tag(self, path):
+        """Get the tag of the path in which tags are created in the current batch, creating it if it's missing"""
+        created = self._created_tags.get(path)
+        if created is not None:
+            return created
+        created = {'path': path, 'children': {}, 'edit': None}
+        open_tag, close_tag = self.get_tag_delimiters(path[-1], list(path[:-1])) if path else (None, None)
+        if not path:
+            created['span'] = (len(self._document), len(self._document))
+        elif open_tag is None:
+            # Created along with its children, in its own parent
+            self._get_created_tag(path[:-1])['children'][path[-1]] = created
+        elif close_tag:
+            created['span'] = (close_tag.start, close_tag.start)
         else:
-            if not open_tag:
-                self.document += "<{} />\n".format(tag)
+            created['span'] = (open_tag.start, open_tag.end)
+            created['empty'] = True
+        self._created_tags[path] = created
+        return created
+
+    def _render_created_tag(self, created):
+        children = ''.join((self._render_created_tag(child) if isinstance(child, dict) else child) + '\n'
+                           for child in created['children'].values())
+        if 'span' in created and 'empty' not in created:
+            return children
+        return "<{0}>\n{1}</{0}>\n".format(created['path'][-1], children)
+
+    def _create_tag(self, tag, parents, element):
+        """
+        Insert the element (i.e. the whole tag) in its parent, creating the missing parents.
+        The tags created in a batch are inserted once, even if their parents are missing.
+        """
+        path = tuple(parents or ())
+        self._get_created_tag(path)['children'][tag] = element
+        while 'span' not in self._created_tags[path]:
+            path = path[:-1]
+        created = self._created_tags[path]
+        start, end = created['span']
+        if created['edit'] is None and self._overlaps_pending_edit(start, end):
+            # The parent is in a part replaced earlier in the batch: create the tag once it's replaced
+            self.commit()
+            self._create_tag(tag, parents, element)
+            return
+        text = self._render_created_tag(created)
+        if created['edit'] is None:
+            created['edit'] = len(self._edits)
+            self._replace(start, end, text)
+        else:
+            self._edits[created['edit']] = self._edits[created['edit']]._replace(text=text)
+
+    def create_tags(self, tag, parents=None):
+        """
+        Create the tag and its parents if it doesn't exists.
+        In a batch, the created tag can only be found once the batch is done: (None, None) is returned.
+        """
+        open_tag, close_tag = self._find_tag_to_modify(tag, parents)
+        if open_tag:
+            return open_tag, close_tag
+        self._create_tag(tag, parents, "<{} />".format(tag))
         return self.get_tag_delimiters(tag, parents)
 
     def set_tag_content(self, tag, content, parents=None):
         """Set content of an existing tag or create it"""
         content = content.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").strip()
-        open_tag, close_tag = self.create_tags(tag, parents)
-        if close_tag:
-            self.document = self.document[:open_tag.end] + content + self.document[close_tag.start:]
+        open_tag, close_tag = self._find_tag_to_modify(tag, parents)
+        if open_tag is None:
+            self._create_tag(tag, parents, "<{0}>{1}</{0}>".format(tag, content))
+        elif close_tag:
+            self._replace(open_tag.end, close_tag.start, content)
         else:
-            self.document = "{0}<{1}>{2}</{1}>{3}".format(
-                self.document[:open_tag.start], tag, content, self.document[open_tag.end:])
+            self._replace(open_tag.start, open_tag.end, "<{0}>{1}</{0}>".format(tag, content))
 
     def remove_tag(self, tag):
         """Remove the first found tag from the document"""
-        open_tag, close_tag = self.get_tag_delimiters(tag)
+        open_tag, close_tag = self._find_tag_to_modify(tag)
         if not open_tag:
             return False
         if not close_tag:
             close_tag = open_tag
-        self.document = self.document[:open_tag.start] + self.document[close_tag.end:]
+        self._replace(open_tag.start, close_tag.end, '')
         return True
 
     def remove_all_tags(self, tag):
         """Remove from the document all the tags matching the one specified"""
-        while self.remove_tag(tag):
-            pass
+        if self._index is None:
+            self._build_index()
+        if any(self._overlaps_pending_edit(element.start, element.end) for element in self._index.get(tag, [])):
+            self.commit()
+            if self._index is None:
+                self._build_index()
+        with self.batch():
+            for element in self._index.get(tag, []):
+                # Nested occurrences are found first and are dropped when removing the outer ones
+                self._replace(element.start, element.end, '')
 
     def write(self, file_name):
-        """Write the XML document into the file"""
-        with open(file_name, "w") as f_xml:
-            f_xml.write(self.document)
+        """Write the XML document into the file, unless it's unchanged"""
+        return write_file(file_name, self.document)
 
     @staticmethod
-    def create_xml_file(file_name, base_file_name, lang):
-        """Creates the default xml translation file"""
+    def create_xml_file(file_name, base_file_name, lang, write=True):
+        """Creates the default xml translation file (only in memory if write is False)"""
         xml_file = XmlFile()
         xml_file.load(base_file_name)
         xml_file.document = xml_file.document.replace('locale=""', 'locale="{}"'.format(lang))
-        xml_file.set_tag_content('language', lang)
-        xml_file.set_tag_content('translation', '1')
-        xml_file.set_tag_content('content', '')
-        xml_file.remove_all_tags("object")
-        xml_file.remove_all_tags("attachment")
-        xml_file.write(file_name)
+        with xml_file.batch():
+            xml_file.set_tag_content('language', lang)
+            xml_file.set_tag_content('translation', '1')
+            xml_file.set_tag_content('content', '')
+            xml_file.remove_all_tags("object")
+            xml_file.remove_all_tags("attachment")
+        if write:
+            xml_file.write(file_name)
         return xml_file
 
 class PropertiesFile(object):
@@ -167,15 +439,37 @@ class PropertiesFile(object):
     # Matches key = value
     PROPERTY_REGEX = r'^({})\s*[=:](.*)'
     ANY_PROPERTY_REGEX = PROPERTY_REGEX.format(r'[^#][^\s]*?')
+    ANY_PROPERTY_PATTERN = re.compile(ANY_PROPERTY_REGEX)
 
     def __init__(self):
-        self.document = ""
+        self.lines = []
         self.properties = {}
-
-    def load(self, document):
-        """Load the document from a string"""
+        self._document = ''
+        self._key_lines = {}
+        self._line_keys = {}
+
+    @property
+    def document(self):
+        if self._document is None:
+            self._document = ''.join(self.lines)
+        return self._document
+
+    @document.setter
+    def document(self, document):
+        self._document = document
+        self.lines = self.split_lines(document)
+        self._key_lines = None
+
+    def load(self, document, properties=None, warn=True):
+        """
+        Load the document from a string, optionally with its properties when they are already known.
+        The duplicated keys are only reported if warn is true.
+        """
         self.document = document
-        self.map_properties()
+        if properties is None:
+            self.map_properties(warn)
+        else:
+            self.properties = dict(properties)
 
     def get_value(self, key):
         """
@@ -184,118 +478,166 @@ class PropertiesFile(object):
         """
         return self.properties[key] if key in self.properties else ''
 
+    def _index_lines(self, properties=None, warn=True):
+        """
+        Index the lines defining each key, and optionally map the properties at the same time.
+        The values continued on the next lines are joined, as the whole span of lines defining a key is edited.
+        """
+        self._key_lines = {}
+        self._line_keys = {}
+        lines = self.lines
+        number = 0
+        while number < len(lines):
+            line = lines[number]
+            end = number + 1
+            if '\\' in line:
+                while end < len(lines) and self.is_continued(lines[end - 1]):
+                    end += 1
+            match = self.ANY_PROPERTY_PATTERN.match(line)
+            if match:
+                key = match.group(1).strip()
+                self._key_lines.setdefault(key, []).append(number)
+                self._line_keys[number] = key
+            if properties is not None:
+                # The match on the line can be reused unless it needs to be cleaned or joined
+                if not match or end > number + 1 or line[0] in whitespace or '#@deprecated#' in line:
+                    logical_line = line if end == number + 1 else self.join_lines(lines[number:end])
+                    match = self.ANY_PROPERTY_PATTERN.match(logical_line.replace('#@deprecated#', '').strip())
+                if match:
+                    self.add_property(properties, match, warn)
+            number = end
+
+    def _unindex_line(self, number):
+        """Forget the key defined by the line, which has been emptied"""
+        key = self._line_keys.pop(number, None)
+        if key is not None:
+            self._key_lines[key].remove(number)
+
+    def _get_line_span(self, key):
+        """Get the range of lines defining the key (first found), including the continuation lines"""
+        if self._key_lines is None:
+            self._index_lines()
+        numbers = self._key_lines.get(key)
+        if not numbers:
+            return None
+        end = numbers[0] + 1
+        while self.is_continued(self.lines[end - 1]) and end < len(self.lines):
+            end += 1
+        return numbers[0], end
+
     def set_value(self, key, new_value):
         """Set value of key or create it"""
         new_value = self.escape(new_value.strip())
-        match = re.search(self.PROPERTY_REGEX.format(key), self.document, re.MULTILINE)
-        if match:
-            key = match.group(1).strip()
-            self.document = self.document[:match.start()] +\
-                            key + '=' + new_value +\
-                            self.document[match.end():]
+        span = self._get_line_span(key)
+        if span:
+            start, end = span
+            last_line = self.lines[end - 1]
+            line_end = last_line[len(last_line.rstrip('\r\n')):]
+            if not line_end and end < len(self.lines):
+                line_end = '\n'
+            self.lines[start] = key + '=' + new_value + line_end
+            for number in range(start + 1, end):
+                self.lines[number] = ''
+                self._unindex_line(number)
         else:
-            if self.document and self.document[-1] != "\n":
-                self.document += "\n"
-            self.document += key + '=' + new_value
+            number = len(self.lines) - 1
+            while number >= 0 and not self.lines[number]:
+                number -= 1
+            if number >= 0:
+                line = self.lines[number]
+                if self.is_continued(line):
+                    # The new key would be part of the value continued at the end of the document
+                    content = line.rstrip('\r\n')
+                    line = content[:-1] + line[len(content):]
+                if not line.endswith("\n"):
+                    line += "\n"
+                self.lines[number] = line
+            self._key_lines.setdefault(key, []).append(len(self.lines))
+            self._line_keys[len(self.lines)] = key
+            self.lines.append(key + '=' + new_value)
+        self._document = None
         self.properties[key] = self.unescape(new_value)
 
     def remove_key(self, key):
         """Remove a key if present"""
-        match = re.search(self.PROPERTY_REGEX.format(key), self.document, re.MULTILINE)
-        if match:
-            new_document = self.document[:match.start()]
-            if match.end() < len(self.document):
-                # Remove the new line if there is one
-                new_document += self.document[match.end()].strip() + self.document[match.end() + 1:]
-            self.document = new_document
+        span = self._get_line_span(key)
+        if span:
+            # Removed lines are kept empty so that the indexed line numbers stay valid
+            for number in range(*span):
+                self.lines[number] = ''
+                self._unindex_line(number)
+            self._document = None
 
     def write(self, file_name):
-        """Write the Java properties into the file"""
-        dirname = os.path.dirname(file_name)
-        if not os.path.exists(dirname):
-            os.makedirs(dirname)
-        with open(file_name, "w") as f_properties:
-            f_properties.write(self.document)
+        """Write the Java properties into the file, unless it's unchanged"""
+        return write_file(file_name, self.document)
+
+    def transform(self, *stages):
+        """Pass the lines of the document through the given stages, in one pass"""
+        lines = self.lines
+        for stage in stages:
+            lines = stage(lines)
+        self.document = ''.join(lines)
 
     def replace_values(self, old, new):
         """Replace 'old' with 'new' in values with parameters"""
-        res = ""
-        for line in self.document.splitlines(True):
-            if re.search(r"\{[0-9]+\}", line):
-                line = line.replace(old, new)
-            res += line
-        return res
+        return ''.join(replace_in_parameterized_lines((old, new))(self.lines))
 
     def filter_import(self):
         """Filter the document for the import"""
-        self.document = self.replace_values("''", "'")
-
-        document = ''
-        is_deprecated = False
-        for line in self.document.splitlines(True):
-            if is_deprecated and line.startswith('#@deprecatedend'):
-                is_deprecated = False
-                document += '#@deprecatedend\n\n'
-            elif line.startswith('#@deprecatedstart'):
-                is_deprecated = True
-                document += '#@deprecatedstart\n'
-            elif line.strip().startswith('notranslationsmarker'):
-                break
-            match = re.search(self.ANY_PROPERTY_REGEX, line)
-            if match:
-                key, value = match.group(1).strip(), match.group(2).strip()
-                if value:
-                    if is_deprecated:
-                        document += '#@deprecated#'
-                    document += key + '=' + value + '\n'
-
-        self.document = document
+        self.transform(replace_in_parameterized_lines(("''", "'")), filter_import_lines)
 
     def filter_export(self):
         """Filter the document for the export"""
-        self.document = self.replace_values("''", "'")
-        self.document = self.replace_values("'", "''")
+        self.transform(replace_in_parameterized_lines(("''", "'"), ("'", "''")))
 
     def replace_with(self, properties_file):
         """Keep this document structure and take keys from the given properties file"""
         # Lines ending with '\' are automatically removed by Weblate and hard to handle
-        self.document = re.sub(r'\\\n\s*', '', self.document)
-        self.map_properties()
-        properties_file.document = re.sub(r'\\\n\s*', '', properties_file.document)
-        properties_file.map_properties()
-
-        document = ''
-        has_no_translations_marker = False
-        for line in self.document.splitlines(True):
-            match = re.search(self.ANY_PROPERTY_REGEX, line.strip())
-            if match:
-                key, value = match.group(1).strip(), match.group(2).strip()
-                if key == 'notranslationsmarker':
-                    has_no_translations_marker = True
-                if value and not has_no_translations_marker:
-                    new_value = self.escape(properties_file.get_value(key))
-                    if new_value:
-                        line = key + '=' + new_value + '\n'
-                    else:
-                        line = '### Missing: ' + key + '=' + value + '\n'
-            document += line
-        self.document = document
+        properties_file.properties.clear()
+        properties_file.transform(join_continued_lines, map_property_lines(properties_file.properties))
+        self.properties.clear()
+        self.transform(join_continued_lines, map_property_lines(self.properties),
+                       replace_property_lines(properties_file))
 
-    def map_properties(self):
+    def map_properties(self, warn=True):
         """Add all properties in memory"""
         self.properties.clear()
-        for line in self.document.replace('#@deprecated#', '').splitlines():
-            match = re.search(self.ANY_PROPERTY_REGEX, line.strip())
-            if match:
-                key, value = match.group(1).strip(), self.unescape(match.group(2).strip())
-                if key in self.properties:
-                    print("Warning: {} already exists.".format(key))
-                self.properties[key] = value
+        self._index_lines(self.properties, warn)
 
     def is_empty(self):
         """Returns true if the all properties are empty"""
         return not self.properties or len("".join(self.properties.values())) == 0
 
+    @staticmethod
+    def add_property(properties, match, warn=True):
+        """Add the property matched with ANY_PROPERTY_PATTERN to the given dictionary"""
+        key, value = match.group(1).strip(), PropertiesFile.unescape(match.group(2).strip())
+        if warn and key in properties:
+            print("Warning: {} already exists.".format(key))
+        properties[key] = value
+
+    @staticmethod
+    def split_lines(document):
+        """Split the document on new lines, keeping them"""
+        lines = [line + '\n' for line in document.split('\n')]
+        lines[-1] = lines[-1][:-1]
+        if not lines[-1]:
+            lines.pop()
+        return lines
+
+    @staticmethod
+    def is_continued(line):
+        """Returns true if the line ends with a backslash escaping the new line"""
+        line = line.rstrip('\r\n')
+        return (len(line) - len(line.rstrip('\\'))) % 2 == 1
+
+    @staticmethod
+    def join_lines(lines):
+        """Join the lines of a continued value, as join_continued_lines does"""
+        parts = [line.rstrip('\r\n')[:-1] for line in lines[:-1]] + [lines[-1]]
+        return parts[0] + ''.join(part.lstrip() for part in parts[1:])
+
     @staticmethod
     def escape(text):
         return text.replace("\n", "\\n")
@@ -304,12 +646,101 @@ class PropertiesFile(object):
     def unescape(text):
         return text.replace("\\n", "\n")
 
+# Stages of PropertiesFile.transform: each one takes an iterable of lines and generates new lines
+
+PARAMETER_PATTERN = re.compile(r"\{[0-9]+\}")
+
+def replace_in_parameterized_lines(*replacements):
+    """Stage replacing each (old, new) pair in the lines with parameters"""
+    def stage(lines):
+        for line in lines:
+            if '{' in line and PARAMETER_PATTERN.search(line):
+                for old, new in replacements:
+                    line = line.replace(old, new)
+            yield line
+    return stage
+
+def filter_import_lines(lines):
+    """Stage keeping only the non empty properties and the deprecation markers"""
+    is_deprecated = False
+    for line in lines:
+        if is_deprecated and line.startswith('#@deprecatedend'):
+            is_deprecated = False
+            yield '#@deprecatedend\n\n'
+        elif line.startswith('#@deprecatedstart'):
+            is_deprecated = True
+            yield '#@deprecatedstart\n'
+        elif line.strip().startswith('notranslationsmarker'):
+            return
+        match = PropertiesFile.ANY_PROPERTY_PATTERN.match(line)
+        if match:
+            key, value = match.group(1).strip(), match.group(2).strip()
+            if value:
+                if is_deprecated:
+                    yield '#@deprecated#' + key + '=' + value + '\n'
+                else:
+                    yield key + '=' + value + '\n'
+
+def join_continued_lines(lines):
+    """Stage removing the backslashes escaping new lines, along with the following whitespaces"""
+    joined = None
+    for line in lines:
+        if joined is not None:
+            line = line.lstrip()
+            if not line:
+                continue
+            line = joined + line
+        if line.endswith('\\\n'):
+            joined = line[:-2]
+        else:
+            joined = None
+            yield line
+    if joined is not None:
+        yield joined
+
+def map_property_lines(properties):
+    """Stage adding the properties found in the lines to the given dictionary"""
+    def stage(lines):
+        for line in lines:
+            match = PropertiesFile.ANY_PROPERTY_PATTERN.match(line.replace('#@deprecated#', '').strip())
+            if match:
+                PropertiesFile.add_property(properties, match)
+            yield line
+    return stage
+
+def replace_property_lines(properties_file):
+    """Stage taking the values from the given properties file, marking the missing ones"""
+    def stage(lines):
+        has_no_translations_marker = False
+        for line in lines:
+            match = PropertiesFile.ANY_PROPERTY_PATTERN.match(line.strip())
+            if match:
+                key, value = match.group(1).strip(), match.group(2).strip()
+                if key == 'notranslationsmarker':
+                    has_no_translations_marker = True
+                if value and not has_no_translations_marker:
+                    new_value = PropertiesFile.escape(properties_file.get_value(key))
+                    if new_value:
+                        line = key + '=' + new_value + '\n'
+                    else:
+                        line = '### Missing: ' + key + '=' + value + '\n'
+            yield line
+    return stage
+
 class FileType(object):
     UNDEFINED = -1
     PROPERTIES = 1
     XML = 2
     XML_PROPERTIES = 3
 
+    TRANSLATION_MARKER = b'<className>XWiki.TranslationDocumentClass</className>'
+    # Matches the beginning of the content of an attachment, which is encoded in base64 from the given size
+    ATTACHMENT_CONTENT_PATTERN = re.compile(rb'<filesize>(\d+)</filesize>(?:(?!</attachment>).){0,4096}?<content>',
+                                            re.DOTALL)
+    CHUNK_SIZE = 64 * 1024
+    # Kept from a chunk to the next one, in case the marker or an attachment header is split
+    CHUNK_OVERLAP = 8 * 1024
+
     @staticmethod
     def get_file_type(file_name):
         if not '.' in file_name or not os.path.isfile(file_name):
@@ -318,9 +749,137 @@ class FileType(object):
         if extension == 'properties':
             return FileType.PROPERTIES
         elif extension == 'xml':
-            with open(file_name) as f:
-                if '<className>XWiki.TranslationDocumentClass</className>' in f.read():
+            with open(file_name, 'rb') as f:
+                if FileType.has_translation_marker(f):
                     return FileType.XML_PROPERTIES
                 else:
                     return FileType.XML
         return FileType.UNDEFINED
+
+    @staticmethod
+    def has_translation_marker(f):
+        """
+        Read the binary stream until the translation marker or the end of the document is found.
+        The inlined attachments are skipped without being read, when their declared size matches.
+        """
+        window, window_start, search_start = b'', 0, 0
+        while True:
+            chunk = f.read(FileType.CHUNK_SIZE)
+            if not chunk:
+                return False
+            window += chunk
+            if FileType.TRANSLATION_MARKER in window:
+                return True
+            if b'</xwikidoc>' in window:
+                return False
+            window_end = window_start + len(window)
+            skip_to = None
+            for match in FileType.ATTACHMENT_CONTENT_PATTERN.finditer(window, max(0, search_start - window_start)):
+                search_start = window_start + match.end()
+                content_end = search_start + 4 * ((int(match.group(1)) + 2) // 3)
+                if content_end > window_end:
+                    skip_to = content_end
+                    break
+            if skip_to is not None:
+                f.seek(skip_to)
+                if f.read(len(b'</content>')) == b'</content>':
+                    window, window_start, search_start = b'</content>', skip_to, skip_to
+                    continue
+                # The content doesn't have the expected size: read it
+                f.seek(window_end)
+            window = window[-FileType.CHUNK_OVERLAP:]
+            window_start = window_end - len(window)
+
+    @staticmethod
+    def get_file_types(directory, jobs=None):
+        """Get the type of all the properties and XML files of the directory tree, detected in parallel"""
+        file_names = []
+        for root, directories, files in os.walk(directory):
+            # Skip hidden directories (e.g. .git) and build directories
+            directories[:] = sorted(name for name in directories
+                                    if not name.startswith('.') and name not in ('target', 'node_modules'))
+            file_names.extend(os.path.join(root, name) for name in sorted(files)
+                              if name.endswith(('.properties', '.xml')))
+        with ThreadPoolExecutor(jobs) as executor:
+            return dict(zip(file_names, executor.map(FileType.get_file_type, file_names)))
+
+
+class WriteStatistics(object):
+    """Number of files and bytes written by write_file, and of unchanged files that were not written"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.written_files = 0
+        self.written_bytes = 0
+        self.unchanged_files = 0
+
+    def add(self, statistics):
+        self.written_files += statistics.written_files
+        self.written_bytes += statistics.written_bytes
+        self.unchanged_files += statistics.unchanged_files
+
+    def __str__(self):
+        return "{} file(s) written ({} bytes), {} unchanged file(s) skipped".format(
+            self.written_files, self.written_bytes, self.unchanged_files)
+
+write_statistics = WriteStatistics()
+
+def write_file(file_name, document):
+    """
+    Write the document into the file, creating its directory if needed, unless the file already has
+    this content. Returns true if the file has been written.
+    The document is written in a temporary file first, and then renamed, so that the file is never
+    left half-written.
+    """
+    data = document.encode(locale.getpreferredencoding(False))
+    if os.path.isfile(file_name) and os.path.getsize(file_name) == len(data):
+        with open(file_name, "rb") as f:
+            if f.read() == data:
+                write_statistics.unchanged_files += 1
+                return False
+    dirname = os.path.dirname(file_name)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+    temporary_file_name = '{}.{}.tmp'.format(file_name, os.getpid())
+    try:
+        with open(temporary_file_name, "wb") as f:
+            f.write(data)
+        if os.path.exists(file_name):
+            shutil.copymode(file_name, temporary_file_name)
+        os.replace(temporary_file_name, file_name)
+    except BaseException:
+        if os.path.exists(temporary_file_name):
+            os.remove(temporary_file_name)
+        raise
+    write_statistics.written_files += 1
+    write_statistics.written_bytes += len(data)
+    return True
+
+def get_translation_file_name(base_file, file_type, language):
+    """Get the name of the translation file of the base file for the given language"""
+    if not language:
+        file_name = base_file
+    else:
+        if file_type == FileType.PROPERTIES:
+            basename = base_file.rsplit('.', 1)[0]
+            file_name = basename + '_' + language + '.properties'
+        else:
+            basename = base_file.rsplit('.', 1)[0]
+            file_name = basename + '.' + language + '.xml'
+    return file_name
+
+def find_languages(base_file, file_type):
+    """Get the languages of the existing translation files of the base file ('' being the base file)"""
+    basename = base_file.rsplit('.', 1)[0]
+    if file_type == FileType.PROPERTIES:
+        files_glob = glob.escape(basename) + '_*.properties'
+        language_regex = re.escape(basename) + r"_(.*)\.properties"
+    else:
+        files_glob = glob.escape(basename) + '.*.xml'
+        language_regex = re.escape(basename) + r"\.(.*)\.xml"
+    languages = ['']
+    for file_name in sorted(glob.glob(files_glob)):
+        match = re.match(language_regex, file_name)
+        languages.append(match.group(1))
+    return languages
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Load all the languages of many translation files at once, keeping a single copy of each file text
+## and referencing keys and values by offsets into it.
+
+import argparse
+import re
+import sys
+
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from string import whitespace
+
+from common import XmlFile, PropertiesFile, FileType, get_translation_file_name, find_languages
+
+MemoryFootprint = namedtuple('MemoryFootprint', ['files', 'keys', 'entries', 'bytes'])
+
+# Same as PropertiesFile.ANY_PROPERTY_REGEX but usable from any position of the text
+ENTRY_PATTERN = re.compile(r'([^#][^\s]*?)\s*[=:](.*)')
+DEPRECATED_PREFIX = '#@deprecated#'
+
+def find_continued_line_end(text, line_start, line_end):
+    """Get the start of the last line of the line continued on the next lines, and the end of this last line"""
+    while line_end < len(text) and line_end > line_start and text[line_end - 1] in '\\\r' and\
+            PropertiesFile.is_continued(text[line_start:line_end]):
+        line_start = line_end + 1
+        line_end = text.find('\n', line_start)
+        if line_end < 0:
+            line_end = len(text)
+    return line_start, line_end
+
+class CorpusFile(object):
+    """Translation file of the corpus: its text and the offsets of its entries"""
+    __slots__ = ['file_name', 'base_file_name', 'language', 'text', 'key_ids', 'value_starts',
+                 'value_ends', 'sorted_key_ids', 'sorted_indexes']
+
+    def __init__(self, file_name, base_file_name, language, text):
+        self.file_name = file_name
+        self.base_file_name = base_file_name
+        self.language = language
+        self.text = text
+        self.key_ids = array('I')
+        self.value_starts = array('I')
+        self.value_ends = array('I')
+        # Key identifiers in ascending order with their entry index, to look the keys up by bisection
+        self.sorted_key_ids = array('I')
+        self.sorted_indexes = array('I')
+
+    def __len__(self):
+        return len(self.key_ids)
+
+    def get_raw_value(self, index):
+        return self.text[self.value_starts[index]:self.value_ends[index]]
+
+    def get_value(self, index):
+        """Get the value of the entry, joining its continued lines like PropertiesFile does"""
+        value = self.get_raw_value(index)
+        if '\n' in value:
+            lines = value.split('\n')
+            value = PropertiesFile.join_lines([line + '\n' for line in lines[:-1]] + lines[-1:]).strip()
+        return PropertiesFile.unescape(value)
+
+    def sort_key_ids(self):
+        """Sort the key identifiers once all the entries are added"""
+        indexes = sorted(range(len(self.key_ids)), key=self.key_ids.__getitem__)
+        self.sorted_key_ids = array('I', (self.key_ids[index] for index in indexes))
+        self.sorted_indexes = array('I', indexes)
+
+    def find_key_id(self, key_id):
+        """Get the index of the entry of the key identifier, or -1 if the file doesn't hold it"""
+        position = bisect_left(self.sorted_key_ids, key_id)
+        if position < len(self.sorted_key_ids) and self.sorted_key_ids[position] == key_id:
+            return self.sorted_indexes[position]
+        return -1
+
+    def memory_usage(self):
+        """Get the number of bytes used by the file text and offsets"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.text)
+        for offsets in (self.key_ids, self.value_starts, self.value_ends, self.sorted_key_ids, self.sorted_indexes):
+            size += sys.getsizeof(offsets)
+        return size
+
+class TranslationCorpus(object):
+    """Translations of many files in all their languages, with keys shared between all the files"""
+    __slots__ = ['keys', 'key_ids', 'files']
+
+    def __init__(self):
+        self.keys = []
+        self.key_ids = {}
+        self.files = {}
+
+    def get_key_id(self, key):
+        """Get the identifier of the key, registering it if needed"""
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            key = sys.intern(key)
+            self.keys.append(key)
+            self.key_ids[key] = key_id
+        return key_id
+
+    def add_text(self, file_name, base_file_name, language, text):
+        """Add a file from the text of its properties"""
+        corpus_file = CorpusFile(file_name, base_file_name, language, text)
+        # Like PropertiesFile.map_properties, the last value found for a key is kept
+        positions = {}
+        line_start = 0
+        while line_start < len(text):
+            line_end = text.find('\n', line_start)
+            if line_end < 0:
+                line_end = len(text)
+            start = line_start
+            while start < line_end and text[start] in whitespace:
+                start += 1
+            if text.startswith(DEPRECATED_PREFIX, start):
+                start += len(DEPRECATED_PREFIX)
+            match = ENTRY_PATTERN.match(text, start, line_end)
+            # The value continued on the next lines spans all of them, joined when it's read
+            last_line_start, logical_line_end = find_continued_line_end(text, line_start, line_end)
+            if match:
+                key = match.group(1).strip()
+                value_start, value_end = match.span(2)
+                if logical_line_end > line_end:
+                    value_end = logical_line_end
+                while value_start < value_end and text[value_start] in whitespace:
+                    value_start += 1
+                while value_end > max(value_start, last_line_start) and text[value_end - 1] in whitespace:
+                    value_end -= 1
+                key_id = self.get_key_id(key)
+                if key_id in positions:
+                    index = positions[key_id]
+                    corpus_file.value_starts[index] = value_start
+                    corpus_file.value_ends[index] = value_end
+                else:
+                    positions[key_id] = len(corpus_file.key_ids)
+                    corpus_file.key_ids.append(key_id)
+                    corpus_file.value_starts.append(value_start)
+                    corpus_file.value_ends.append(value_end)
+            line_start = logical_line_end + 1
+        corpus_file.sort_key_ids()
+        self.files[file_name] = corpus_file
+        return corpus_file
+
+    def add_file(self, file_name, base_file_name=None, language=''):
+        """Add a translation file, returning None if it's not a translation file"""
+        file_type = FileType.get_file_type(file_name)
+        if file_type == FileType.PROPERTIES:
+            with open(file_name, "r", encoding="ISO-8859-1") as f:
+                text = f.read()
+        elif file_type == FileType.XML_PROPERTIES:
+            xml = XmlFile()
+            xml.load(file_name)
+            text = xml.get_tag_content('content')
+        else:
+            return None
+        return self.add_text(file_name, base_file_name or file_name, language, text)
+
+    def add_translations(self, base_file_name):
+        """Add the base file and all its existing translations"""
+        file_type = FileType.get_file_type(base_file_name)
+        if file_type not in [FileType.PROPERTIES, FileType.XML_PROPERTIES]:
+            return []
+        corpus_files = []
+        for language in find_languages(base_file_name, file_type):
+            file_name = get_translation_file_name(base_file_name, file_type, language)
+            corpus_file = self.add_file(file_name, base_file_name, language)
+            if corpus_file:
+                corpus_files.append(corpus_file)
+        return corpus_files
+
+    def get_translations(self, base_file_name):
+        """Get the files of the given base file, by language"""
+        return {corpus_file.language: corpus_file for corpus_file in self.files.values()
+                if corpus_file.base_file_name == base_file_name}
+
+    def get_value(self, file_name, key):
+        """Get the value of the key in the given file (empty if not found)"""
+        corpus_file = self.files.get(file_name)
+        key_id = self.key_ids.get(key)
+        if corpus_file is None or key_id is None:
+            return ''
+        index = corpus_file.find_key_id(key_id)
+        if index < 0:
+            return ''
+        return corpus_file.get_value(index)
+
+    def get_properties(self, file_name):
+        """Get the properties of the given file, as PropertiesFile.properties would do"""
+        corpus_file = self.files[file_name]
+        return {self.keys[key_id]: corpus_file.get_value(index)
+                for index, key_id in enumerate(corpus_file.key_ids)}
+
+    def memory_footprint(self):
+        """Get the number of files, keys and entries and the approximate number of bytes used"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.keys) + sys.getsizeof(self.key_ids) +\
+            sys.getsizeof(self.files)
+        size += sum(sys.getsizeof(key) for key in self.keys)
+        entries = 0
+        for file_name, corpus_file in self.files.items():
+            size += sys.getsizeof(file_name) + corpus_file.memory_usage()
+            entries += len(corpus_file)
+        return MemoryFootprint(len(self.files), len(self.keys), entries, size)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Load the translations of the given base translation ' +
+        'files in all their languages and display the memory used.')
+    parser.add_argument('base_files', metavar='base_file', nargs='*', help='Base translation file ' +
+        '(read from the standard input if none is given)')
+    args = parser.parse_args()
+    return args.base_files
+
+def main():
+    """Main function"""
+    base_files = parse_arguments() or sys.stdin.read().split()
+    corpus = TranslationCorpus()
+    for base_file in base_files:
+        corpus.add_translations(base_file)
+    footprint = corpus.memory_footprint()
+    print("Files: {}".format(footprint.files))
+    print("Distinct keys: {}".format(footprint.keys))
+    print("Entries: {}".format(footprint.entries))
+    print("Memory: {:.1f} MiB".format(footprint.bytes / 1024.0 / 1024.0))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Index of the translation files defining each key in a checkout, kept on disk between runs.
+## Only the files whose size or modification time changed (or the ones modified since the last indexed commit)
+## are parsed again when updating the index.
+
+import argparse
+import os
+import posixpath
+import sqlite3
+import subprocess
+import sys
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from common import XmlFile, PropertiesFile, FileType
+
+INDEX_VERSION = 3
+DEFAULT_INDEX_FILE = '.translation-keys'
+
+def get_base_file(path, paths):
+    """Get the base file of the translation file and its language ('' for a base file), named as in find_languages"""
+    directory, name = posixpath.split(path)
+    if name.endswith('.properties'):
+        stem = name[:-len('.properties')]
+        # The language may contain underscores (e.g. pt_BR), unlike most base file names
+        position = stem.rfind('_')
+        while position > 0:
+            base_file = posixpath.join(directory, stem[:position] + '.properties')
+            if base_file in paths:
+                return base_file, stem[position + 1:]
+            position = stem.rfind('_', 0, position)
+    elif name.endswith('.xml') and '.' in name[:-len('.xml')]:
+        stem, language = name[:-len('.xml')].rsplit('.', 1)
+        base_file = posixpath.join(directory, stem + '.xml')
+        if base_file in paths:
+            return base_file, language
+    return path, ''
+
+def find_translation_files(directory):
+    """Get the properties and XML files of the directory tree, relative to it, skipping the same directories as
+    FileType.get_file_types"""
+    paths = []
+    for root, directories, files in os.walk(directory):
+        directories[:] = [name for name in directories
+                          if not name.startswith('.') and name not in ('target', 'node_modules')]
+        relative_root = os.path.relpath(root, directory).replace(os.sep, '/')
+        for name in files:
+            if name.endswith(('.properties', '.xml')):
+                paths.append(name if relative_root == '.' else relative_root + '/' + name)
+    return paths
+
+def read_keys(file_name):
+    """Get the keys defined by the translation file, or None if it isn't a translation file"""
+    file_type = FileType.get_file_type(file_name)
+    if file_type == FileType.XML:
+        # The translations of a page don't hold the translation object, only the page in the default language does
+        stem = file_name[:-len('.xml')]
+        if '.' not in os.path.basename(stem) or\
+                FileType.get_file_type(stem.rsplit('.', 1)[0] + '.xml') != FileType.XML_PROPERTIES:
+            return None
+        file_type = FileType.XML_PROPERTIES
+    properties = PropertiesFile()
+    if file_type == FileType.PROPERTIES:
+        with open(file_name, "r", encoding="ISO-8859-1") as f:
+            properties.load(f.read())
+    elif file_type == FileType.XML_PROPERTIES:
+        xml = XmlFile()
+        xml.load(file_name)
+        properties.load(xml.get_tag_content('content'))
+    else:
+        return None
+    # The marker separating the keys which are not translated is defined by most files
+    return [key for key in properties.properties if key and key != 'notranslationsmarker']
+
+class KeyIndex(object):
+    """SQLite index of the keys defined by each translation file of a directory tree"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metadata (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            translation INTEGER NOT NULL,
+            modified INTEGER NOT NULL,
+            base_file TEXT,
+            language TEXT
+        );
+        CREATE TABLE IF NOT EXISTS keys (
+            key TEXT NOT NULL,
+            file INTEGER NOT NULL,
+            PRIMARY KEY (key, file)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS keys_file ON keys (file);
+    """
+
+    def __init__(self, file_name=DEFAULT_INDEX_FILE, directory='.'):
+        self.directory = os.path.abspath(directory)
+        self.connection = sqlite3.connect(file_name)
+        self.connection.executescript(self.SCHEMA)
+        # The index is rebuilt when it was made by another version or for another directory
+        if self.get_metadata('version') != str(INDEX_VERSION) or self.get_metadata('directory') != self.directory:
+            self.clear()
+
+    def close(self):
+        self.connection.close()
+
+    def get_metadata(self, name):
+        row = self.connection.execute("SELECT value FROM metadata WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_metadata(self, name, value):
+        self.connection.execute("INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)", (name, value))
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM keys")
+            self.connection.execute("DELETE FROM files")
+            self.connection.execute("DELETE FROM metadata")
+            self.set_metadata('version', str(INDEX_VERSION))
+            self.set_metadata('directory', self.directory)
+
+    def get_changed_paths(self, commit):
+        """Get the paths modified since the commit, including the uncommitted and untracked ones"""
+        command = ['git', '-C', self.directory]
+        changed = subprocess.check_output(command + ['diff', '--name-only', '--no-renames', '--relative', '-z',
+                                                     commit])
+        untracked = subprocess.check_output(command + ['ls-files', '--others', '--exclude-standard', '-z'])
+        return [path for path in (changed + untracked).decode('utf-8').split('\0') if path]
+
+    def update(self, paths=None, use_git=False, jobs=None):
+        """
+        Index the files of the given paths (all the files of the directory by default, or with use_git the ones
+        modified since the last indexed commit and the ones which were modified when indexed) whose size or
+        modification time changed.
+        Returns the number of parsed and removed files, and the keys of the parsed files.
+        """
+        commit = None
+        # Paths differing from the indexed commit, whose files have to be checked again on the next update even
+        # if they are reverted (None when unknown, e.g. without git)
+        modified_paths = None
+        if use_git:
+            commit = subprocess.check_output(['git', '-C', self.directory, 'rev-parse', 'HEAD']).decode().strip()
+            modified_paths = set(self.get_changed_paths(commit))
+            indexed_commit = self.get_metadata('commit')
+            if indexed_commit:
+                paths = set(self.get_changed_paths(indexed_commit) if indexed_commit != commit else [])
+                paths.update(modified_paths)
+                paths.update(path for (path,) in self.connection.execute("SELECT path FROM files WHERE modified"))
+                paths = sorted(paths)
+        known = {path: (file_id, size, mtime) for file_id, path, size, mtime
+                 in self.connection.execute("SELECT id, path, size, mtime FROM files")}
+        if paths is None:
+            paths = find_translation_files(self.directory)
+            removed = set(known).difference(paths)
+        else:
+            paths = [path for path in paths if path.endswith(('.properties', '.xml'))]
+            removed = set(path for path in paths if path in known
+                          and not os.path.isfile(os.path.join(self.directory, path)))
+
+        changed = []
+        for path in paths:
+            if path in removed:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, path))
+            except OSError:
+                continue
+            if path not in known or known[path][1:] != (stat.st_size, stat.st_mtime_ns):
+                changed.append((path, stat.st_size, stat.st_mtime_ns))
+
+        file_names = [os.path.join(self.directory, path) for path, _, _ in changed]
+        all_keys = []
+        if file_names:
+            with ProcessPoolExecutor(jobs) as executor:
+                all_keys = list(executor.map(read_keys, file_names, chunksize=max(1, len(file_names) // 256)))
+
+        with self.connection:
+            obsolete = [(known[path][0],) for path in removed] + [(known[path][0],) for path, _, _ in changed
+                                                                 if path in known]
+            self.connection.executemany("DELETE FROM keys WHERE file = ?", obsolete)
+            self.connection.executemany("DELETE FROM files WHERE id = ?", obsolete)
+            for (path, size, mtime), keys in zip(changed, all_keys):
+                cursor = self.connection.execute(
+                    "INSERT INTO files (path, size, mtime, translation, modified) VALUES (?, ?, ?, ?, ?)",
+                    (path, size, mtime, keys is not None, modified_paths is None or path in modified_paths))
+                if keys:
+                    self.connection.executemany("INSERT OR IGNORE INTO keys (key, file) VALUES (?, ?)",
+                                                ((key, cursor.lastrowid) for key in keys))
+            if modified_paths is not None:
+                self.connection.executemany("UPDATE files SET modified = ? WHERE path = ?",
+                                            ((path in modified_paths, path) for path in paths))
+            if commit:
+                self.set_metadata('commit', commit)
+            if changed or removed:
+                self.update_base_files()
+        return len(changed), len(removed), set(key for keys in all_keys if keys for key in keys)
+
+    def update_base_files(self):
+        """Update the base file and language of the files, which depend on the existing files"""
+        files = self.connection.execute("SELECT id, path, base_file, language FROM files").fetchall()
+        paths = set(path for _, path, _, _ in files)
+        updates = []
+        for file_id, path, base_file, language in files:
+            definition = get_base_file(path, paths)
+            if definition != (base_file, language):
+                updates.append(definition + (file_id,))
+        self.connection.executemany("UPDATE files SET base_file = ?, language = ? WHERE id = ?", updates)
+
+    def get_definitions(self, keys):
+        """Get the base files defining each key, with the languages in which they are defined"""
+        definitions = {}
+        for key in keys:
+            base_files = defaultdict(list)
+            for base_file, language in self.connection.execute(
+                    "SELECT files.base_file, files.language FROM keys JOIN files ON files.id = keys.file "
+                    "WHERE keys.key = ?", (key,)):
+                base_files[base_file].append(language)
+            definitions[key] = base_files
+        return definitions
+
+    def get_duplicates(self, keys=None):
+        """Get the keys (among the given ones, or all of them) defined by several base files"""
+        if keys is None:
+            return [row[0] for row in self.connection.execute(
+                "SELECT keys.key FROM keys JOIN files ON files.id = keys.file WHERE files.language = '' "
+                "GROUP BY keys.key HAVING COUNT(*) > 1 ORDER BY keys.key")]
+        return sorted(key for key in keys if self.connection.execute(
+            "SELECT COUNT(*) FROM keys JOIN files ON files.id = keys.file WHERE keys.key = ? AND files.language = ''",
+            (key,)).fetchone()[0] > 1)
+
+def read_key_list(key_list_file):
+    """Get the keys of the list used by migrate_keys.py, ignoring their new names"""
+    if not os.path.isfile(key_list_file):
+        sys.exit('The specified key_list is not a file')
+    with open(key_list_file, "r") as f:
+        return [line.split('=', 1)[0] for line in f.read().splitlines() if line]
+
+def print_definitions(key, base_files):
+    print(key)
+    if not base_files:
+        print("  not found")
+    for base_file in sorted(base_files):
+        print("  {} ({})".format(base_file, ', '.join(sorted(language or 'default'
+                                                             for language in base_files[base_file]))))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Find the translation files defining some keys, using an index '
+        'of the keys of a directory tree.')
+    parser.add_argument('command', choices=['update', 'lookup', 'duplicates', 'info'], help='update: index the '
+        'files modified since the last update (or the given paths), lookup: display the base files and languages '
+        'defining the given keys, duplicates: display the keys defined by several base files, info: display '
+        'statistics about the index')
+    parser.add_argument('arguments', metavar='path_or_key', nargs='*', help='Paths to update (relative to the '
+        'directory) or keys to look up')
+    parser.add_argument('-C', '--directory', default='.', help='Root of the indexed files (default is the current '
+        'directory)')
+    parser.add_argument('--index', metavar='index_file', default=DEFAULT_INDEX_FILE, help='Index file (default '
+        'is {})'.format(DEFAULT_INDEX_FILE))
+    parser.add_argument('--git', action='store_true', help='Only check the files modified since the last indexed '
+        'commit when updating')
+    parser.add_argument('--key-list', metavar='key_list', help='File listing the keys to look up, as given to '
+        'migrate_keys.py')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, help='Number of processes parsing the files')
+    return parser.parse_args()
+
+def main():
+    """Main function"""
+    args = parse_arguments()
+    index = KeyIndex(args.index, args.directory)
+    try:
+        if args.command == 'update':
+            parsed, removed, keys = index.update(args.arguments or None, args.git, args.jobs)
+            print("{} file(s) parsed, {} file(s) removed".format(parsed, removed))
+            duplicates = index.get_duplicates(keys)
+            if duplicates:
+                print("Warning: {} key(s) of the parsed files are defined by several base files: {}".format(
+                    len(duplicates), ', '.join(duplicates)))
+        elif args.command == 'lookup':
+            keys = args.arguments + (read_key_list(args.key_list) if args.key_list else [])
+            for key, base_files in index.get_definitions(keys).items():
+                print_definitions(key, base_files)
+        elif args.command == 'duplicates':
+            for key, base_files in index.get_definitions(index.get_duplicates()).items():
+                print_definitions(key, base_files)
+        else:
+            files, translations, keys = index.connection.execute(
+                "SELECT COUNT(*), SUM(translation), (SELECT COUNT(DISTINCT key) FROM keys) FROM files").fetchone()
+            print("Index file: {} ({:.1f} KiB)".format(args.index, os.path.getsize(args.index) / 1024.0))
+            print("Directory: {}".format(index.directory))
+            print("Files: {} ({} translation files)".format(files, translations or 0))
+            print("Keys: {}".format(keys))
+            print("Indexed commit: {}".format(index.get_metadata('commit') or 'none'))
+    finally:
+        index.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,8 @@
 #!/bin/bash
 
-## Following options  are needed to avoid the subshell issue because of using a while read loop with a pipe.
-## See: https://mywiki.wooledge.org/BashFAQ/024
-set +m
-shopt -s lastpipe
-
 SCRIPT_NAME=`basename "$0"`
 SCRIPT_DIRECTORY=`dirname "$0"`
-COMPONENTS_SCRIPT="retrieve_components.py"
+CHANGES_SCRIPT="translation_changes.py"
 
 CURRENT_DIRECTORY=`pwd`
 PROJECT=`basename "$CURRENT_DIRECTORY"`
@@ -38,11 +33,6 @@ function usage() {
   exit 1
 }
 
-function showDiff {
-  ## Use --no-pager to not block the execution.
-  git --no-pager diff --color=always $START_COMMIT..$END_COMMIT -- $1
-}
-
 if [[ -z "$START_COMMIT" ]] || [[ -z "$END_COMMIT" ]] || [[ -z "$BRANCH" ]]; then
   usage
 fi
@@ -59,64 +49,16 @@ if [[ $? != 0 ]]; then
   exit 4
 fi
 
-UPDATED_TRANSLATIONS=()
-UPDATED_LANGUAGES=()
-
 echo "Listing [$PROJECT] translation changes between [$START_COMMIT] and [$END_COMMIT]..."
 
+## The files of both commits are read and compared by the Python engine, using a single git process.
+OPTIONS=()
+[ "$VERBOSE_ENABLED" == true ] && OPTIONS+=(--verbose)
+[ "$DIFF_ENABLED" == true ] && OPTIONS+=(--diff)
+[ "$DIFFALL_ENABLED" == true ] && OPTIONS+=(--diffAll)
+
 if [ "$VERBOSE_ENABLED" == true ]; then
-    echo "Calling $SCRIPT_DIRECTORY/$COMPONENTS_SCRIPT $PROJECT $BRANCH"
+    echo "Calling $SCRIPT_DIRECTORY/$CHANGES_SCRIPT $PROJECT $BRANCH $START_COMMIT $END_COMMIT ${OPTIONS[@]}"
 fi
 
-$SCRIPT_DIRECTORY/$COMPONENTS_SCRIPT $PROJECT $BRANCH | while read -r TRANSLATION_BASE_FILE; do
-  if [ "$VERBOSE_ENABLED" == true ]; then
-    echo "Checking file [$TRANSLATION_BASE_FILE]..."
-  fi
-  if [[ -f $TRANSLATION_BASE_FILE ]]; then
-    TRANSLATION_BASE_FILE="${TRANSLATION_BASE_FILE/.properties/_*.properties}"
-    TRANSLATION_BASE_FILE="${TRANSLATION_BASE_FILE/.xml/.*.xml}"
-    for TRANSLATION_LANGUAGE_FILE in $TRANSLATION_BASE_FILE; do
-      if [ "$VERBOSE_ENABLED" == true ]; then
-        echo "  Checking translation [$TRANSLATION_LANGUAGE_FILE]..."
-      fi
-
-      ## Valid changes are of the format "+property=value" (i.e. additions or modifications) of a line.
-      LINES_CHANGED=`git diff $START_COMMIT..$END_COMMIT -- $TRANSLATION_LANGUAGE_FILE | grep -E "^\+[^#+]+=" | wc -l`
-      if [[ $LINES_CHANGED -gt 0 ]]; then
-        ## Print the checked translation file only when it contains modifications and if verbose mode is not already enabled.
-        if [ "$VERBOSE_ENABLED" == false ]; then
-          echo
-          echo "  Checking translation [$TRANSLATION_LANGUAGE_FILE]..."
-        fi
-        echo "    FOUND CHANGES: $LINES_CHANGED"
-        UPDATED_TRANSLATIONS+=($TRANSLATION_LANGUAGE_FILE)
-        if [[ $TRANSLATION_LANGUAGE_FILE == *.xml ]]; then
-          LANGUAGE=`echo "$TRANSLATION_LANGUAGE_FILE" | cut -d. -f2`
-        elif [[ $TRANSLATION_LANGUAGE_FILE == *.properties ]]; then
-          LANGUAGE=`echo "$TRANSLATION_LANGUAGE_FILE" | sed -E 's_.*/[^_]+\_(.*)\.properties_\1_'`
-        fi
-        UPDATED_LANGUAGES+=($LANGUAGE)
-
-        if [ "$DIFF_ENABLED" == true ] || [ "$DIFFALL_ENABLED" == true ]; then
-          showDiff $TRANSLATION_LANGUAGE_FILE
-        fi
-      else
-        if [ "$DIFFALL_ENABLED" == true ]; then
-          showDiff $TRANSLATION_LANGUAGE_FILE
-        fi
-      fi
-    done
-  fi
-done
-
-echo
-echo "[REPORT]"
-
-echo
-echo "Updated translation files (${#UPDATED_TRANSLATIONS[@]}):"
-printf "%s\n" "${UPDATED_TRANSLATIONS[@]}"
-
-echo
-UNIQUE_UPDATED_LANGUAGES=`printf "%s\n" "${UPDATED_LANGUAGES[@]}" | sort -u`
-echo "Updated languages (`printf "%s\n" "${UNIQUE_UPDATED_LANGUAGES[@]}" | wc -l`):"
-printf "%s\n" "${UNIQUE_UPDATED_LANGUAGES[@]}"
+$SCRIPT_DIRECTORY/$CHANGES_SCRIPT "$PROJECT" "$BRANCH" "$START_COMMIT" "$END_COMMIT" "${OPTIONS[@]}"
@@ -21,68 +21,136 @@
 # ---------------------------------------------------------------------------
 
 import argparse
-import glob
 import os
-import re
 import sys
 
-from common import XmlFile, PropertiesFile, FileType
+from concurrent.futures import ProcessPoolExecutor
 
-def get_translation_file_name(base_file, file_type, language):
-    if not language:
-        file_name = base_file
-    else:
-        if file_type == FileType.PROPERTIES:
-            basename = base_file.rsplit('.', 1)[0]
-            file_name = basename + '_' + language + '.properties'
-        else:
-            basename = base_file.rsplit('.', 1)[0]
-            file_name = basename + '.' + language + '.xml'
-    return file_name
+from common import XmlFile, PropertiesFile, FileType, get_translation_file_name, find_languages, write_file,\
+    WriteStatistics, write_statistics
+from parse_cache import ParseCache, DEFAULT_CACHE_FILE
 
-def open_or_create_translation(base_file_name, file_name, file_type, lang):
+def open_or_create_translation(base_file_name, file_name, file_type, lang, cache=None):
     properties = PropertiesFile()
     xml = None
     if file_type == FileType.PROPERTIES:
         if os.path.isfile(file_name):
             with open(file_name, "r", encoding="ISO-8859-1") as f:
                 document = f.read()
-            properties.load(document)
+            if cache:
+                properties = cache.load_properties(file_name, document)
+            else:
+                properties.load(document)
     else:
         if os.path.isfile(file_name):
+            if cache:
+                xml = cache.load_xml(file_name)
+                return (cache.load_properties(file_name, xml.get_tag_content('content')), xml)
             xml = XmlFile()
             xml.load(file_name)
         else:
-            xml = XmlFile.create_xml_file(file_name, base_file_name, lang)
+            # The file is only written with the migrated keys
+            xml = XmlFile.create_xml_file(file_name, base_file_name, lang, write=False)
         properties.load(xml.get_tag_content('content'))
     return (properties, xml)
 
+class TranslationFiles(object):
+    """Translation files opened during the migrations, written once all of them are done"""
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.files = {}
+        self.languages = set()
+
+    def find_languages(self, base_file_name, file_type):
+        """Same as find_languages, including the translations created in memory"""
+        languages = find_languages(base_file_name, file_type)
+        for lang in sorted(lang for (base, lang) in self.languages if base == base_file_name):
+            if lang not in languages:
+                languages.append(lang)
+        return languages
+
+    def open(self, base_file_name, file_type, lang):
+        """Open the translation of the base file in the given language, only once"""
+        file_name = get_translation_file_name(base_file_name, file_type, lang)
+        if file_name not in self.files:
+            properties, xml = open_or_create_translation(base_file_name, file_name, file_type, lang,
+                                                         self.cache)
+            self.files[file_name] = (file_type, properties, xml)
+            self.languages.add((base_file_name, lang))
+        return self.files[file_name][1]
+
+    def write(self):
+        """Write all the opened files, once all their documents are successfully computed"""
+        documents = []
+        for file_name, (file_type, properties, xml) in self.files.items():
+            if file_type == FileType.PROPERTIES:
+                documents.append((file_name, properties.document))
+            else:
+                xml.set_tag_content('content', properties.document)
+                documents.append((file_name, xml.document))
+        for file_name, document in documents:
+            if write_file(file_name, document) and self.cache:
+                # Keep the cache valid for the next runs, which would otherwise parse the file again
+                file_type, properties, xml = self.files[file_name]
+                properties.map_properties()
+                self.cache.update_entry(file_name, file_type, properties.properties,
+                                        xml.get_elements() if xml else None)
+        self.files.clear()
+        self.languages.clear()
+
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Migrate translation keys between two base ' +
         'translation files (and the available languages).')
-    parser.add_argument('source_file', metavar='source_file', help='Source base translation file')
-    parser.add_argument('destination_file', metavar='destination_file', help='Destination base ' +
+    parser.add_argument('source_file', metavar='source_file', nargs='?', help='Source base translation file')
+    parser.add_argument('destination_file', metavar='destination_file', nargs='?', help='Destination base ' +
         'translation file')
-    parser.add_argument('key_list', metavar='key_list', help='List of keys to migrate')
+    parser.add_argument('key_list', metavar='key_list', nargs='?', help='List of keys to migrate')
+    parser.add_argument('--batch', metavar='manifest', help='Perform all the migrations listed in the ' +
+        'manifest, one per line with its source_file, destination_file and key_list separated by spaces')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1, help='Number of languages ' +
+        'processed in parallel (default is 1)')
+    parser.add_argument('--cache', metavar='cache_file', nargs='?', const=DEFAULT_CACHE_FILE,
+        help='Reuse the files parsed by the previous runs, using the given cache file (default is ' +
+        '{})'.format(DEFAULT_CACHE_FILE))
     args = parser.parse_args()
-    return args.source_file, args.destination_file, args.key_list
+    if args.batch:
+        if args.source_file:
+            parser.error('no migration can be given along with --batch')
+    elif not args.key_list:
+        parser.error('the source_file, destination_file and key_list are required')
+    return args
 
-def process_source(source_file, source_basename, source_type, key_list):
-    languages_keys = {'': []}
-    if source_type == FileType.PROPERTIES:
-        files_glob = source_basename + '_*.properties'
-        language_regex = source_basename + r"_(.*)\.properties"
-    else:
-        files_glob = source_basename + '.*.xml'
-        language_regex = source_basename + r"\.(.*)\.xml"
+def read_manifest(manifest_file):
+    """Get the (source_file, destination_file, key_list_file) migrations listed in the manifest"""
+    if not os.path.isfile(manifest_file):
+        sys.exit('The specified manifest is not a file')
+    migrations = []
+    with open(manifest_file, "r") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split()
+            if len(parts) != 3:
+                sys.exit('Invalid migration at line {} of the manifest'.format(number))
+            migrations.append(tuple(parts))
+    return migrations
 
-    for file_name in glob.glob(files_glob):
-        match = re.search(language_regex, file_name, re.MULTILINE)
-        languages_keys[match.group(1)] = []
+def read_key_list(key_list_file):
+    if not os.path.isfile(key_list_file):
+        sys.exit('The specified key_list is not a file')
+    with open(key_list_file, "r") as f:
+        return f.read().splitlines()
+
+def process_source(source_file, source_basename, source_type, key_list, files=None, languages=None):
+    opened_files = files if files is not None else TranslationFiles()
+    languages_keys = {}
+    for lang in opened_files.find_languages(source_file, source_type):
+        if languages is None or lang in languages:
+            languages_keys[lang] = []
 
     for lang in languages_keys.keys():
-        file_name = get_translation_file_name(source_file, source_type, lang)
-        properties, xml = open_or_create_translation(source_file, file_name, source_type, lang)
+        properties = opened_files.open(source_file, source_type, lang)
         for entry in key_list:
             parts = entry.split('=', 1)
             oldKey = parts[0]
@@ -91,48 +159,115 @@ def process_source(source_file, source_basename, source_type, key_list):
             if value:
                 languages_keys[lang].append((newKey, value))
                 properties.remove_key(oldKey)
-        if source_type == FileType.PROPERTIES:
-            properties.write(file_name)
-        else:
-            xml.set_tag_content('content', properties.document)
-            xml.write(file_name)
+    if files is None:
+        opened_files.write()
     return languages_keys
 
-def process_destination(destination_file, destination_type, languages_keys):
+def process_destination(destination_file, destination_type, languages_keys, files=None):
+    opened_files = files if files is not None else TranslationFiles()
     for lang in languages_keys.keys():
         translations = languages_keys[lang]
         if not translations:
             continue
-        file_name = get_translation_file_name(destination_file, destination_type, lang)
-        properties, xml = open_or_create_translation(destination_file, file_name,
-                          destination_type, lang)
+        properties = opened_files.open(destination_file, destination_type, lang)
         for (key, value) in translations:
             properties.set_value(key, value)
-        if destination_type == FileType.PROPERTIES:
-            properties.write(file_name)
-        else:
-            xml.set_tag_content('content', properties.document)
-            xml.write(file_name)
+    if files is None:
+        opened_files.write()
+
+def migrate(migrations, cache=None, languages=None):
+    """
+    Apply the checked migrations, optionally only on the given languages.
+    Return the keys moved in each language.
+    """
+    # Each translation file is parsed and written only once, whatever the number of migrations using it
+    files = TranslationFiles(cache)
+    moved_keys = {}
+    for source_file, source_type, destination_file, destination_type, key_list in migrations:
+        source_basename, _ = source_file.rsplit('.', 1)
+        languages_keys = process_source(source_file, source_basename, source_type, key_list, files,
+                                        languages)
+        process_destination(destination_file, destination_type, languages_keys, files)
+        for lang, translations in languages_keys.items():
+            moved_keys.setdefault(lang, []).extend(key for key, _ in translations)
+    files.write()
+    return moved_keys
+
+worker_cache = None
+
+def init_worker(cache_file):
+    """Load the cache of a worker process, whose refreshed entries are sent back to the main process"""
+    global worker_cache
+    worker_cache = ParseCache(cache_file) if cache_file else None
+
+def migrate_language(migrations, lang):
+    """Apply the checked migrations on a single language, in a worker process"""
+    # Only count what is written for this language, the worker process being reused for other ones
+    write_statistics.reset()
+    if worker_cache:
+        worker_cache.updated_entries = {}
+    moved_keys = migrate(migrations, worker_cache, [lang]).get(lang, [])
+    return moved_keys, write_statistics, worker_cache.updated_entries if worker_cache else {}
+
+def migrate_in_parallel(migrations, jobs, cache=None):
+    """Apply the checked migrations, processing the languages in parallel"""
+    languages = set()
+    for source_file, source_type, _, _, _ in migrations:
+        languages.update(find_languages(source_file, source_type))
+    moved_keys = {}
+    failures = []
+    statistics = WriteStatistics()
+    cache_file = cache.file_name if cache else None
+    with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(cache_file,)) as executor:
+        futures = [(lang, executor.submit(migrate_language, migrations, lang)) for lang in sorted(languages)]
+        for lang, future in futures:
+            try:
+                moved_keys[lang], written, updated_entries = future.result()
+                statistics.add(written)
+                if cache:
+                    cache.merge(updated_entries)
+            except Exception as e:
+                print("Error: the migration failed for the language [{}]: {}".format(lang, e))
+                failures.append(lang)
+    return moved_keys, failures, statistics
+
+def print_summary(moved_keys):
+    print("Moved keys:")
+    for lang in sorted(moved_keys):
+        print("  {}: {}".format(lang or 'default', len(moved_keys[lang])))
 
 def main():
     """Main function"""
-    source_file, destination_file, key_list_file = parse_arguments()
-    source_basename, _ = source_file.rsplit('.', 1)
-
-    if not os.path.isfile(key_list_file):
-        sys.exit('The specified key_list is not a file')
-    with open(key_list_file, "r") as f:
-        key_list = f.read().splitlines()
+    args = parse_arguments()
+    if args.batch:
+        migrations = read_manifest(args.batch)
+    else:
+        migrations = [(args.source_file, args.destination_file, args.key_list)]
 
-    source_type = FileType.get_file_type(source_file)
-    destination_type = FileType.get_file_type(destination_file)
-    if source_type not in [FileType.XML_PROPERTIES, FileType.PROPERTIES]:
-        sys.exit('Wrong file type for source_file')
-    if destination_type not in [FileType.XML_PROPERTIES, FileType.PROPERTIES]:
-        sys.exit('Wrong file type for destination_file')
+    cache = ParseCache(args.cache) if args.cache else None
+    get_file_type = cache.get_file_type if cache else FileType.get_file_type
+    # Check all the migrations before modifying any file
+    checked_migrations = []
+    for source_file, destination_file, key_list_file in migrations:
+        key_list = read_key_list(key_list_file)
+        source_type = get_file_type(source_file)
+        destination_type = get_file_type(destination_file)
+        if source_type not in [FileType.XML_PROPERTIES, FileType.PROPERTIES]:
+            sys.exit('Wrong file type for source_file {}'.format(source_file))
+        if destination_type not in [FileType.XML_PROPERTIES, FileType.PROPERTIES]:
+            sys.exit('Wrong file type for destination_file {}'.format(destination_file))
+        checked_migrations.append((source_file, source_type, destination_file, destination_type, key_list))
 
-    languages_keys = process_source(source_file, source_basename, source_type, key_list)
-    process_destination(destination_file, destination_type, languages_keys)
+    if args.jobs > 1:
+        moved_keys, failures, statistics = migrate_in_parallel(checked_migrations, args.jobs, cache)
+    else:
+        moved_keys, failures, statistics = migrate(checked_migrations, cache), [], write_statistics
+    if cache:
+        cache.save()
+    print_summary(moved_keys)
+    print(statistics)
+    if failures:
+        sys.exit('The migration failed for the languages: {}'.format(', '.join(failures)))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Cache of the parsed translation files, kept on disk between runs.
+## Entries are identified by the path, size and modification time of the files.
+## The cache is stored as compressed JSON, so that loading a cache file found in a checkout can't execute code.
+
+import argparse
+import os
+import json
+import zlib
+
+from collections import OrderedDict
+
+from common import XmlFile, XmlElement, PropertiesFile, FileType, TagDelimiter
+
+CACHE_VERSION = 3
+DEFAULT_CACHE_FILE = '.translation-cache'
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+class CacheEntry(object):
+    """Parsed information about a file in a given state"""
+    __slots__ = ['size', 'mtime', 'file_type', 'properties', 'elements']
+
+    def __init__(self, size, mtime, file_type):
+        self.size = size
+        self.mtime = mtime
+        self.file_type = file_type
+        self.properties = None
+        self.elements = None
+
+    def to_json(self):
+        return [self.size, self.mtime, self.file_type, self.properties, self.elements]
+
+    @staticmethod
+    def from_json(data):
+        size, mtime, file_type, properties, elements = data
+        if not isinstance(size, int) or not isinstance(mtime, int) or not isinstance(properties, (dict, type(None)))\
+                or not isinstance(elements, (list, type(None))):
+            raise ValueError('Invalid cache entry')
+        entry = CacheEntry(size, mtime, file_type)
+        entry.properties = properties
+        entry.elements = elements
+        return entry
+
+def pack_elements(elements):
+    """Get the XmlFile elements as compact tuples"""
+    return [(element.name, element.parents, element.open_tag.start, element.open_tag.end)
+            + ((element.close_tag.start, element.close_tag.end) if element.close_tag else ())
+            for element in elements]
+
+def unpack_elements(packed_elements):
+    """Get the XmlFile elements from their compact tuples"""
+    elements = []
+    for packed in packed_elements:
+        close_tag = TagDelimiter(packed[4], packed[5]) if len(packed) > 4 else None
+        elements.append(XmlElement(packed[0], tuple(packed[1]), TagDelimiter(packed[2], packed[3]), close_tag))
+    return elements
+
+class ParseCache(object):
+    """Cache of the file types, properties and XML elements of the translation files"""
+    def __init__(self, file_name=DEFAULT_CACHE_FILE, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_size=DEFAULT_MAX_SIZE):
+        self.file_name = file_name
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        # Entries refreshed after their file has been written, by path
+        self.updated_entries = {}
+        self.modified = False
+        self.load()
+
+    def load(self):
+        """Read the cache file, starting with an empty cache if it's missing or invalid"""
+        self.entries = OrderedDict()
+        if not os.path.isfile(self.file_name):
+            return
+        try:
+            with open(self.file_name, "rb") as f_cache:
+                cache = json.loads(zlib.decompress(f_cache.read()).decode('utf-8'))
+            if cache["version"] == CACHE_VERSION:
+                self.entries = OrderedDict((path, CacheEntry.from_json(entry)) for path, entry in cache["entries"])
+        except (OSError, ValueError, TypeError, KeyError, zlib.error):
+            print("Warning: ignoring the invalid cache [{}]".format(self.file_name))
+            self.entries = OrderedDict()
+
+    def dump(self):
+        """Get the compressed content of the cache file"""
+        cache = {"version": CACHE_VERSION, "entries": [[path, entry.to_json()] for path, entry in self.entries.items()]}
+        return zlib.compress(json.dumps(cache, separators=(',', ':')).encode('utf-8'))
+
+    def save(self):
+        """Write the cache file if it has been modified, evicting the least recently used entries"""
+        if not self.modified:
+            return
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        data = self.dump()
+        while len(data) > self.max_size and self.entries:
+            for _ in range(max(1, len(self.entries) // 4)):
+                self.entries.popitem(last=False)
+            data = self.dump()
+        temporary_file_name = self.file_name + '.tmp'
+        with open(temporary_file_name, "wb") as f_cache:
+            f_cache.write(data)
+        os.replace(temporary_file_name, self.file_name)
+        self.modified = False
+
+    def get_entry(self, file_name):
+        """Get the entry of the file in its current state, creating it if needed"""
+        path = os.path.abspath(file_name)
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry.size == stat.st_size and entry.mtime == stat.st_mtime_ns:
+            self.entries.move_to_end(path)
+            return entry
+        entry = CacheEntry(stat.st_size, stat.st_mtime_ns, None)
+        self.entries[path] = entry
+        self.modified = True
+        return entry
+
+    def update_entry(self, file_name, file_type, properties, elements=None):
+        """Refresh the entry of a file that has just been written, with its properties and XML elements"""
+        path = os.path.abspath(file_name)
+        stat = os.stat(path)
+        entry = CacheEntry(stat.st_size, stat.st_mtime_ns, file_type)
+        entry.properties = dict(properties)
+        if elements is not None:
+            entry.elements = pack_elements(elements)
+        self.entries[path] = entry
+        self.entries.move_to_end(path)
+        self.updated_entries[path] = entry
+        self.modified = True
+        return entry
+
+    def merge(self, entries):
+        """Add the entries refreshed by another process"""
+        for path, entry in entries.items():
+            self.entries[path] = entry
+            self.entries.move_to_end(path)
+        if entries:
+            self.modified = True
+
+    def get_file_type(self, file_name):
+        """Same as FileType.get_file_type, using the cache when possible"""
+        if not os.path.isfile(file_name):
+            return FileType.get_file_type(file_name)
+        entry = self.get_entry(file_name)
+        if entry.file_type is None:
+            entry.file_type = FileType.get_file_type(file_name)
+            self.modified = True
+        return entry.file_type
+
+    def load_xml(self, file_name):
+        """Load the XML file, reusing its elements when they are already known"""
+        entry = self.get_entry(file_name)
+        xml = XmlFile()
+        if entry.elements is None:
+            xml.load(file_name)
+            entry.elements = pack_elements(xml.get_elements())
+            self.modified = True
+        else:
+            xml.load(file_name, unpack_elements(entry.elements))
+        return xml
+
+    def load_properties(self, file_name, document):
+        """Load the properties of the file from the given document (its content for XML files)"""
+        entry = self.get_entry(file_name)
+        properties = PropertiesFile()
+        properties.load(document, entry.properties)
+        if entry.properties is None:
+            entry.properties = dict(properties.properties)
+            self.modified = True
+        return properties
+
+    def prune(self):
+        """Remove the entries of the files that have been modified or deleted"""
+        for path, entry in list(self.entries.items()):
+            if not os.path.isfile(path):
+                del self.entries[path]
+            else:
+                stat = os.stat(path)
+                if entry.size != stat.st_size or entry.mtime != stat.st_mtime_ns:
+                    del self.entries[path]
+        self.modified = True
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Inspect or prune the cache of parsed translation files.')
+    parser.add_argument('command', choices=['info', 'prune', 'clear'], help='info: display statistics '
+        'about the cache, prune: remove the outdated entries and apply the size limits, clear: remove '
+        'the cache')
+    parser.add_argument('--cache', metavar='cache_file', default=DEFAULT_CACHE_FILE, help='Cache file '
+        '(default is {})'.format(DEFAULT_CACHE_FILE))
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES, help='Maximum number of '
+        'entries to keep when pruning')
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE // 1024 // 1024, help='Maximum '
+        'size of the cache file in MiB when pruning')
+    return parser.parse_args()
+
+def main():
+    """Main function"""
+    args = parse_arguments()
+    if args.command == 'clear':
+        if os.path.isfile(args.cache):
+            os.remove(args.cache)
+        return
+    cache = ParseCache(args.cache, args.max_entries, args.max_size * 1024 * 1024)
+    if args.command == 'prune':
+        cache.prune()
+        cache.save()
+    outdated = 0
+    for path, entry in cache.entries.items():
+        if not os.path.isfile(path) or os.path.getsize(path) != entry.size or\
+                os.stat(path).st_mtime_ns != entry.mtime:
+            outdated += 1
+    size = os.path.getsize(args.cache) if os.path.isfile(args.cache) else 0
+    print("Cache file: {} ({:.1f} KiB)".format(args.cache, size / 1024.0))
+    print("Entries: {} ({} outdated)".format(len(cache.entries), outdated))
+    print("With properties: {}".format(sum(1 for entry in cache.entries.values() if entry.properties is not None)))
+    print("With XML elements: {}".format(sum(1 for entry in cache.entries.values() if entry.elements is not None)))
+
+if __name__ == '__main__':
+    main()
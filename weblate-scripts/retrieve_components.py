@@ -2,41 +2,295 @@
 
 ## This script aims at displaying the template path for each component on a given project
 ## information are directly retrieved from the XWiki.org Weblate instance.
+## Several projects and branches can be retrieved at once, in which case each line also contains the
+## project and the branch of the component, separated by tabs.
+## The components are kept in a local manifest, revalidated with conditional requests once its TTL expired.
 
 import argparse
+import glob
+import json
+import os
 import requests
+import sys
+import time
 
-WEBLATE_REST_API_COMPONENTS_URL = "https://l10n.xwiki.org/api/projects/%s/components/?format=json"
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode, urlsplit, urlunsplit, parse_qsl
+
+WEBLATE_REST_API_URL = "https://l10n.xwiki.org/api/"
+WEBLATE_REST_API_COMPONENTS_PATH = "projects/%s/components/?format=json"
+WEBLATE_REST_API_COMPONENTS_URL = WEBLATE_REST_API_URL + WEBLATE_REST_API_COMPONENTS_PATH
+MAX_CONCURRENT_REQUESTS = 8
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'xwiki-weblate-components.json')
+DEFAULT_TTL = 24 * 60 * 60
 
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Output Weblate components paths')
-    parser.add_argument('project_name', metavar='project_name', help='Project name')
-    parser.add_argument('branch', metavar='branch', help='Branch to filter components (e.g. master)')
+    parser.add_argument('project_name', metavar='project_name', nargs='?', help='Project name')
+    parser.add_argument('branch', metavar='branch', nargs='?', help='Branch to filter components (e.g. master)')
+    parser.add_argument('-p', '--projects', metavar='project', nargs='+', default=[],
+                        help='Project names, retrieved concurrently')
+    parser.add_argument('-b', '--branches', metavar='branch', nargs='+', default=[],
+                        help='Branches to filter components')
+    parser.add_argument('--url', metavar='url', default=WEBLATE_REST_API_URL,
+                        help='Weblate REST API URL (default is %s)' % WEBLATE_REST_API_URL)
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help='Maximum number of concurrent requests (default is %d)' % MAX_CONCURRENT_REQUESTS)
+    parser.add_argument('--manifest', metavar='manifest_file', default=DEFAULT_MANIFEST_FILE,
+                        help='Local manifest of the components (default is %s)' % DEFAULT_MANIFEST_FILE)
+    parser.add_argument('--no-manifest', action='store_true', help='Always retrieve the whole list of components')
+    parser.add_argument('--ttl', metavar='seconds', type=int, default=DEFAULT_TTL,
+                        help='Duration during which the manifest is used without revalidating it '
+                        '(default is %d)' % DEFAULT_TTL)
+    parser.add_argument('--offline', action='store_true', help='Only use the manifest, without any request')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--languages', action='store_true',
+                        help='Also output the pattern of the language files of each template, separated by a tab')
+    output.add_argument('--files', action='store_true',
+                        help='Output the existing template files of the current directory and their language files')
     args = parser.parse_args()
-    return args.project_name,args.branch
+    args.projects = ([args.project_name] if args.project_name else []) + args.projects
+    args.branches = ([args.branch] if args.branch else []) + args.branches
+    if not args.projects or not args.branches:
+        parser.error('at least one project and one branch are required')
+    return args
+
+
+def get_language_pattern(template):
+    """Get the glob pattern of the language files of the given template"""
+    if '.properties' in template:
+        return template.replace('.properties', '_*.properties', 1)
+    if '.xml' in template:
+        return template.replace('.xml', '.*.xml', 1)
+    return None
+
+
+def create_entry(component):
+    """Get the manifest entry of a component"""
+    return {
+        "branch": component["branch"],
+        "template": component["template"],
+        "languages": get_language_pattern(component["template"] or '')
+    }
+
+
+class ComponentManifest(object):
+    """Local copy of the pages of components of each project, with the validators of these pages"""
+    def __init__(self, file_name=DEFAULT_MANIFEST_FILE):
+        self.file_name = file_name
+        self.projects = {}
+        self.modified = False
+        self.load()
+
+    def load(self):
+        """Read the manifest, starting with an empty one if it's missing or invalid"""
+        self.projects = {}
+        if not os.path.isfile(self.file_name):
+            return
+        try:
+            with open(self.file_name, "r") as f_manifest:
+                manifest = json.load(f_manifest)
+        except (OSError, ValueError):
+            print("Warning: ignoring the invalid manifest [%s]" % self.file_name, file=sys.stderr)
+            return
+        if manifest.get("version") == MANIFEST_VERSION:
+            self.projects = manifest["projects"]
+
+    def save(self):
+        """Write the manifest if it has been modified"""
+        if not self.modified:
+            return
+        directory = os.path.dirname(self.file_name)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        temporary_file_name = '%s.%d.tmp' % (self.file_name, os.getpid())
+        with open(temporary_file_name, "w") as f_manifest:
+            json.dump({"version": MANIFEST_VERSION, "projects": self.projects}, f_manifest, indent=1)
+        os.replace(temporary_file_name, self.file_name)
+        self.modified = False
+
+    def get_pages(self, url):
+        """Get the pages stored for the given project URL, or None"""
+        project = self.projects.get(url)
+        return project["pages"] if project else None
+
+    def is_fresh(self, url, ttl):
+        """Check if the pages of the project URL have been validated less than ttl seconds ago"""
+        project = self.projects.get(url)
+        return project is not None and time.time() - project["validated"] < ttl
+
+    def set_pages(self, url, pages):
+        self.projects[url] = {"validated": time.time(), "pages": pages}
+        self.modified = True
 
 
-def display_components(results, branch):
-    for component in results:
-        if (component["branch"] == branch):
-            print(component["template"])
+def create_session(pool_size=MAX_CONCURRENT_REQUESTS):
+    """Create a session keeping alive up to pool_size connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
 
-def request_result(url, branch):
-    r = requests.get(url)
-    if r.status_code == 200:
+def get_page(session, url, cached_page=None):
+    """
+    Get a page of components as stored in the manifest, or None if it can't be retrieved.
+    The cached page is returned as is when the server answers that it's not modified.
+    """
+    headers = {}
+    if cached_page:
+        if cached_page.get("etag"):
+            headers["If-None-Match"] = cached_page["etag"]
+        if cached_page.get("last_modified"):
+            headers["If-Modified-Since"] = cached_page["last_modified"]
+    try:
+        r = session.get(url, headers=headers)
+    except requests.exceptions.RequestException as e:
+        print("Warning: cannot retrieve [%s]: %s" % (url, e), file=sys.stderr)
+        return None
+    if r.status_code == 304 and cached_page:
+        return cached_page
+    if r.status_code != 200:
+        print("Warning: cannot retrieve [%s]: status %d" % (url, r.status_code), file=sys.stderr)
+        return None
+    # The answer may not be the expected JSON, e.g. the error page of a proxy
+    try:
         json_answer = r.json()
-        if json_answer["results"] and len(json_answer["results"]) > 0:
-            display_components(json_answer["results"], branch)
-        if json_answer["next"]:
-            request_result(json_answer["next"], branch)
+        return {
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "count": json_answer.get("count"),
+            "next": json_answer["next"],
+            "results": [create_entry(component) for component in json_answer["results"] or []]
+        }
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print("Warning: invalid components page [%s]: %s" % (url, e), file=sys.stderr)
+        return None
+
+
+def get_page_url(url, page):
+    """Get the URL of the given page of results"""
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query) if name != 'page']
+    query.append(('page', str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def get_remaining_page_urls(url, first_page):
+    """Get the URLs of the pages following the first one, or None if their number is unknown"""
+    page_size = len(first_page["results"])
+    if not first_page.get("count") or not page_size:
+        return None
+    page_count = (first_page["count"] + page_size - 1) // page_size
+    return [get_page_url(url, page) for page in range(2, page_count + 1)]
+
+
+def get_cached_page(cached_pages, index):
+    return cached_pages[index] if cached_pages and index < len(cached_pages) else None
+
+
+def request_pages(session, executor, urls, cached_pages):
+    """
+    Get the pages of components of each project URL, revalidating the cached pages.
+    The first page of each project gives the number of pages, which are then all requested at once.
+    Return None instead of the pages of a project when one of them can't be retrieved.
+    """
+    first_pages = list(executor.map(lambda url, cached: get_page(session, url, get_cached_page(cached, 0)),
+                                    urls, cached_pages))
+    futures = []
+    for url, first_page, cached in zip(urls, first_pages, cached_pages):
+        page_urls = get_remaining_page_urls(url, first_page) if first_page and first_page["next"] else []
+        futures.append(None if page_urls is None else
+                       [executor.submit(get_page, session, page_url, get_cached_page(cached, index))
+                        for index, page_url in enumerate(page_urls, 1)])
+    projects_pages = []
+    for first_page, page_futures, cached in zip(first_pages, futures, cached_pages):
+        if first_page is None:
+            pages = None
+        elif page_futures is None:
+            # Unknown number of pages: follow the links
+            pages = [first_page]
+            url = first_page["next"]
+            while url:
+                page = get_page(session, url, get_cached_page(cached, len(pages)))
+                if page is None:
+                    pages = None
+                    break
+                pages.append(page)
+                url = page["next"]
+        else:
+            pages = [first_page] + [future.result() for future in page_futures]
+            if None in pages:
+                pages = None
+        projects_pages.append(pages)
+    return projects_pages
+
+
+def retrieve_components(projects, api_url=WEBLATE_REST_API_URL, jobs=MAX_CONCURRENT_REQUESTS, manifest=None,
+                        ttl=DEFAULT_TTL, offline=False):
+    """
+    Get the manifest entries of the components of each project, requesting the projects and their pages
+    concurrently. When a manifest is given, the projects validated less than ttl seconds ago are taken from it
+    and the other ones are revalidated with conditional requests.
+    """
+    urls = [api_url + WEBLATE_REST_API_COMPONENTS_PATH % project for project in projects]
+    cached_pages = [manifest.get_pages(url) if manifest else None for url in urls]
+    outdated = [index for index, url in enumerate(urls)
+                if not offline and not (manifest and manifest.is_fresh(url, ttl))]
+    if outdated:
+        session = create_session(jobs)
+        with ThreadPoolExecutor(jobs) as executor:
+            outdated_pages = request_pages(session, executor, [urls[index] for index in outdated],
+                                           [cached_pages[index] for index in outdated])
+        for index, pages in zip(outdated, outdated_pages):
+            if pages is not None:
+                cached_pages[index] = pages
+                if manifest:
+                    manifest.set_pages(urls[index], pages)
+            elif cached_pages[index] is not None:
+                print("Warning: using the outdated components of [%s]" % projects[index], file=sys.stderr)
+    components = {}
+    for project, pages in zip(projects, cached_pages):
+        if pages is None and offline:
+            print("Warning: no components of [%s] in the manifest" % project, file=sys.stderr)
+        components[project] = [entry for page in pages or [] for entry in page["results"]]
+    return components
+
+
+def get_files(entry):
+    """Get the template file of the entry and its language files, if it exists in the current directory"""
+    if not entry["template"] or not os.path.isfile(entry["template"]):
+        return []
+    languages = sorted(glob.glob(entry["languages"])) if entry["languages"] else []
+    return [entry["template"]] + languages
 
 
 def main():
     """Main function"""
-    project_name,branch = parse_arguments()
-    request_result(WEBLATE_REST_API_COMPONENTS_URL % project_name, branch)
+    args = parse_arguments()
+    manifest = None if args.no_manifest else ComponentManifest(args.manifest)
+    components = retrieve_components(args.projects, args.url, args.jobs, manifest, args.ttl, args.offline)
+    if manifest:
+        manifest.save()
+    prefix_enabled = len(args.projects) > 1 or len(args.branches) > 1
+    for project in args.projects:
+        for branch in args.branches:
+            prefix = "%s\t%s\t" % (project, branch) if prefix_enabled else ""
+            for entry in components[project]:
+                # Components without template (e.g. glossaries) have no file to output
+                if entry["branch"] != branch or not entry["template"]:
+                    continue
+                if args.files:
+                    for file_name in get_files(entry):
+                        print(prefix + file_name)
+                elif args.languages:
+                    print("%s%s\t%s" % (prefix, entry["template"], entry["languages"] or ""))
+                else:
+                    print(prefix + entry["template"])
 
 
 if __name__ == "__main__":
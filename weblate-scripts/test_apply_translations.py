@@ -0,0 +1,88 @@
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+
+## Tests of apply_translations.py (run with python3 -m unittest test_apply_translations).
+
+import os
+import subprocess
+import tempfile
+import unittest
+
+from collections import defaultdict
+
+from apply_translations import match_glob, resolve_files
+
+FILES = [
+    'src/A.properties',
+    'src/A_fr.properties',
+    'src/A_pt_BR.properties',
+    'src/A_B.properties',
+    'src/A_B_fr.properties',
+    'src/sub/A_de.properties',
+    'pages/Main/Page.xml',
+    'pages/Main/Page.fr.xml',
+    'pages/Other/Page.de.xml',
+    'pages/.hidden/Page.es.xml',
+    'pages/Main/.Page.it.xml',
+    'pages/Main/Page.fr.xml.orig',
+]
+PATTERNS = [
+    'src/A_*.properties',
+    'src/A_B_*.properties',
+    'src/*_fr.properties',
+    'pages/Main/Page.*.xml',
+    'pages/*/Page.*.xml',
+    'pages/Main/*.xml',
+    'pages/*/Page.[df]?.xml',
+    'missing/A_*.properties',
+]
+
+def get_files_by_directory(file_names):
+    files_by_directory = defaultdict(list)
+    for file_name in file_names:
+        files_by_directory[os.path.dirname(file_name)].append(file_name)
+    return files_by_directory
+
+class MatchGlobTest(unittest.TestCase):
+    def test_same_as_shell_expansion(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for file_name in FILES:
+                os.makedirs(os.path.join(directory, os.path.dirname(file_name)), exist_ok=True)
+                open(os.path.join(directory, file_name), 'w').close()
+            files_by_directory = get_files_by_directory(FILES)
+            for pattern in PATTERNS:
+                # Same expansion as the former apply_translations.sh, without the unmatched patterns
+                expanded = subprocess.check_output(['bash', '-c', 'shopt -s nullglob; for f in ' + pattern +
+                                                    '; do echo "$f"; done'], cwd=directory).decode().split()
+                self.assertEqual(sorted(match_glob(pattern, files_by_directory)), sorted(expanded), pattern)
+
+    def test_resolve_files(self):
+        entries = [{"template": "src/A.properties", "languages": "src/A_*.properties"},
+                   {"template": "pages/Main/Page.xml", "languages": "pages/Main/Page.*.xml"},
+                   {"template": "src/Missing.properties", "languages": "src/Missing_*.properties"},
+                   {"template": "src/A_B.properties", "languages": None}]
+        self.assertEqual(resolve_files(entries, set(FILES)),
+                         ['src/A.properties', 'src/A_B.properties', 'src/A_B_fr.properties', 'src/A_fr.properties',
+                          'src/A_pt_BR.properties', 'pages/Main/Page.xml', 'pages/Main/Page.fr.xml',
+                          'src/A_B.properties'])
+
+if __name__ == '__main__':
+    unittest.main()
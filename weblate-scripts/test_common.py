@@ -0,0 +1,128 @@
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Tests of the XmlFile and PropertiesFile modifications (run with python3 -m unittest test_common).
+
+import os
+import tempfile
+import unittest
+
+from common import XmlFile, PropertiesFile
+
+DOCUMENT = ('<xwikidoc>\n<language></language>\n<object><className>C</className></object>\n'
+            '<object><className>D</className></object>\n</xwikidoc>\n')
+
+class XmlFileBatchTest(unittest.TestCase):
+    def create_xml(self):
+        xml = XmlFile()
+        xml.document = DOCUMENT
+        return xml
+
+    def test_edit_in_previously_removed_tag(self):
+        xml = self.create_xml()
+        with xml.batch():
+            xml.remove_all_tags('object')
+            xml.set_tag_content('object', 'new')
+            xml.set_tag_content('className', 'E')
+        self.assertEqual(xml.document, '<xwikidoc>\n<language></language>\n\n\n</xwikidoc>\n')
+
+    def test_missing_parent_created_once_in_batch(self):
+        xml = self.create_xml()
+        with xml.batch():
+            xml.set_tag_content('a', '1', ['xwikidoc', 'p'])
+            self.assertEqual(xml.create_tags('b', ['xwikidoc', 'p']), (None, None))
+            xml.set_tag_content('a', '2', ['xwikidoc', 'p'])
+            # Lookups are still done on the document as it was before the batch
+            self.assertEqual(xml.get_tag_content('language'), '')
+            xml.set_tag_content('language', 'fr')
+        self.assertEqual(xml.document, '<xwikidoc>\n<language>fr</language>\n'
+                                       '<object><className>C</className></object>\n'
+                                       '<object><className>D</className></object>\n'
+                                       '<p>\n<a>2</a>\n<b />\n</p>\n\n</xwikidoc>\n')
+
+    def test_create_tags_outside_batch(self):
+        xml = self.create_xml()
+        open_tag, close_tag = xml.create_tags('b', ['xwikidoc', 'p'])
+        self.assertEqual(xml.document[open_tag.start:open_tag.end], '<b />')
+        self.assertIsNone(close_tag)
+
+NESTED_DOCUMENTS = [
+    '<xwikidoc locale="">\n<language>x<content><content/></content></language>\n</xwikidoc>\n',
+    '<xwikidoc>\n<language/>\n<content>a<object><p/></object></content>\n<object>o</object>\n</xwikidoc>\n',
+    '<xwikidoc>\n<content><translation/><language/></content>\n<attachment><object/></attachment>\n</xwikidoc>\n',
+    '<xwikidoc>\n<language><object><translation>t</translation></object></language>\n</xwikidoc>\n',
+    '<xwikidoc>\n<language><attachment/><content/></language><object/>\n</xwikidoc>\n',
+]
+
+class CreateXmlFileTest(unittest.TestCase):
+    def create_sequentially(self, document, lang):
+        """Same modifications as create_xml_file, applied one after another"""
+        xml = XmlFile()
+        xml.document = document.replace('locale=""', 'locale="{}"'.format(lang))
+        xml.set_tag_content('language', lang)
+        xml.set_tag_content('translation', '1')
+        xml.set_tag_content('content', '')
+        while xml.remove_tag('object'):
+            pass
+        while xml.remove_tag('attachment'):
+            pass
+        return xml.document
+
+    def test_same_as_sequential_modifications(self):
+        with tempfile.TemporaryDirectory() as directory:
+            base_file_name = os.path.join(directory, 'Page.xml')
+            for document in NESTED_DOCUMENTS:
+                with open(base_file_name, 'w') as f:
+                    f.write(document)
+                xml = XmlFile.create_xml_file(None, base_file_name, 'fr', write=False)
+                self.assertEqual(xml.document, self.create_sequentially(document, 'fr'))
+
+class PropertiesFileContinuationTest(unittest.TestCase):
+    def create_properties(self, document):
+        properties = PropertiesFile()
+        properties.load(document)
+        return properties
+
+    def test_set_values_after_continued_last_line(self):
+        properties = self.create_properties('a=x \\\n')
+        properties.set_value('b', '1')
+        properties.set_value('c', '2')
+        properties.set_value('a', 'y')
+        properties.set_value('b', '3')
+        self.assertEqual(properties.document, 'a=y\nb=3\nc=2')
+
+    def test_continued_value(self):
+        properties = self.create_properties('k=line one \\\n   line two\nz=1\n')
+        self.assertEqual(properties.get_value('k'), 'line one line two')
+        properties.remove_key('k')
+        self.assertEqual(properties.document, 'z=1\n')
+        properties.set_value('k', 'new')
+        self.assertEqual(properties.document, 'z=1\nk=new')
+
+    def test_set_continued_value(self):
+        properties = self.create_properties('k=a \\\n b\nz=1\n')
+        properties.set_value('k', 'c')
+        properties.set_value('z', '2')
+        properties.map_properties()
+        self.assertEqual(properties.document, 'k=c\nz=2\n')
+        self.assertEqual(properties.properties, {'k': 'c', 'z': '2'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Tests of the TranslationCorpus (run with python3 -m unittest test_corpus).
+
+import unittest
+
+from common import PropertiesFile
+from corpus import TranslationCorpus
+
+CONTINUED_DOCUMENTS = [
+    'k=line one \\\n   line two\nz=1\n',
+    'k=a \\\n  b=c \\\n  d:e\nz=1',
+    'k=\\\n  v\n',
+    'k=a \\\n\nz=1\n',
+    'k=end \\',
+    '# comment \\\nq=1\nk=v\n',
+    'k=a\\\\\nz=2\n',
+    '#@deprecated#k=x \\\n y\n',
+    'k=a \\\r\n b\r\nz=3\r\n',
+]
+
+class TranslationCorpusTest(unittest.TestCase):
+    def test_continued_values(self):
+        corpus = TranslationCorpus()
+        for number, document in enumerate(CONTINUED_DOCUMENTS):
+            file_name = 'file{}.properties'.format(number)
+            corpus.add_text(file_name, file_name, '', document)
+            properties = PropertiesFile()
+            properties.load(document)
+            self.assertEqual(corpus.get_properties(file_name), properties.properties)
+            for key, value in properties.properties.items():
+                self.assertEqual(corpus.get_value(file_name, key), value)
+
+if __name__ == '__main__':
+    unittest.main()
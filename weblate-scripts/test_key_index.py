@@ -0,0 +1,73 @@
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+
+## Tests of the KeyIndex updates (run with python3 -m unittest test_key_index).
+
+import os
+import subprocess
+import tempfile
+import unittest
+
+from unittest import mock
+
+from key_index import KeyIndex
+
+class KeyIndexGitTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.git('init', '-q')
+        self.write('A.properties', 'a=1\nnotranslationsmarker=\n')
+        self.write('A_fr.properties', 'a=un\n')
+        self.git('add', '.')
+        self.git('-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'init')
+        self.index = KeyIndex(os.path.join(self.directory.name, '.translation-keys'), self.directory.name)
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def git(self, *arguments):
+        subprocess.check_call(['git', '-C', self.directory.name] + list(arguments))
+
+    def write(self, path, text):
+        with open(os.path.join(self.directory.name, path), 'w') as f:
+            f.write(text)
+
+    def test_reverted_file(self):
+        self.index.update(use_git=True)
+        self.write('A.properties', 'a=1\nb=2\n')
+        self.assertEqual(self.index.update(use_git=True)[:2], (1, 0))
+        self.assertEqual(self.index.get_definitions(['b'])['b'], {'A.properties': ['']})
+        self.git('checkout', '-q', 'A.properties')
+        self.assertEqual(self.index.update(use_git=True)[:2], (1, 0))
+        self.assertEqual(self.index.get_definitions(['b'])['b'], {})
+        self.assertEqual(sorted(self.index.get_definitions(['a'])['a']['A.properties']), ['', 'fr'])
+        self.assertEqual(self.index.get_duplicates(), [])
+
+    def test_no_process_without_changes(self):
+        self.index.update(use_git=True)
+        with mock.patch('key_index.ProcessPoolExecutor') as executor:
+            self.assertEqual(self.index.update(use_git=True), (0, 0, set()))
+            self.assertEqual(self.index.update(), (0, 0, set()))
+        executor.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
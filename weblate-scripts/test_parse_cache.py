@@ -0,0 +1,77 @@
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+
+## Tests of the ParseCache (run with python3 -m unittest test_parse_cache).
+
+import os
+import pickle
+import tempfile
+import unittest
+import zlib
+
+from common import FileType
+from parse_cache import ParseCache
+
+DOCUMENT = '<xwikidoc>\n<language>fr</language>\n<content>a=1\nb=2</content>\n<o><p/></o>\n</xwikidoc>\n'
+
+class Payload(object):
+    loaded = False
+
+    def __reduce__(self):
+        return (setattr, (Payload, 'loaded', True))
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.directory.name, 'cache')
+        self.file_name = os.path.join(self.directory.name, 'Page.fr.xml')
+        with open(self.file_name, 'w') as f:
+            f.write(DOCUMENT)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_reloaded_entries(self):
+        cache = ParseCache(self.cache_file)
+        xml = cache.load_xml(self.file_name)
+        properties = cache.load_properties(self.file_name, xml.get_tag_content('content'))
+        cache.get_file_type(self.file_name)
+        elements = [(element.name, element.parents, element.open_tag, element.close_tag)
+                    for element in xml.get_elements()]
+        cache.save()
+
+        cache = ParseCache(self.cache_file)
+        self.assertEqual(cache.get_file_type(self.file_name), FileType.XML)
+        xml = cache.load_xml(self.file_name)
+        self.assertEqual([(element.name, element.parents, element.open_tag, element.close_tag)
+                          for element in xml.get_elements()], elements)
+        self.assertEqual(cache.load_properties(self.file_name, '').properties, properties.properties)
+        self.assertFalse(cache.modified)
+
+    def test_pickle_not_loaded(self):
+        with open(self.cache_file, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps(Payload())))
+        cache = ParseCache(self.cache_file)
+        self.assertFalse(Payload.loaded)
+        self.assertEqual(len(cache.entries), 0)
+
+if __name__ == '__main__':
+    unittest.main()
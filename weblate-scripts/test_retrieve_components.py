@@ -0,0 +1,137 @@
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+
+## Tests of retrieve_components.py against a local stand-in of the Weblate REST API
+## (run with python3 -m unittest test_retrieve_components).
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from retrieve_components import retrieve_components, ComponentManifest
+
+COMPONENTS = {
+    "xwiki-platform": [
+        {"branch": "master", "template": "a/A.properties"},
+        {"branch": "master", "template": None},
+        {"branch": "stable-16.10.x", "template": "b/B.xml"},
+        {"branch": "master", "template": "c/C.xml"},
+        {"branch": "master", "template": "d/D.properties"},
+    ]
+}
+PAGE_SIZE = 2
+
+class WeblateHandler(BaseHTTPRequestHandler):
+    """Answer the pages of components, with an ETag, or an HTML page for the unknown projects"""
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        project = parts.path.split('/')[3]
+        page = int(parse_qs(parts.query).get('page', ['1'])[0])
+        self.server.requests.append((project, page, self.headers.get('If-None-Match')))
+        if project not in COMPONENTS:
+            self.send_answer(200, 'text/html', b'<html><body>Service unavailable</body></html>')
+            return
+        etag = '"%s-%d"' % (project, page)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_answer(304)
+            return
+        components = COMPONENTS[project]
+        results = components[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        next_url = None
+        if page * PAGE_SIZE < len(components):
+            next_url = 'http://%s:%d/api/projects/%s/components/?format=json&page=%d'\
+                % (self.server.server_address + (project, page + 1))
+        body = json.dumps({"count": len(components), "next": next_url, "results": results}).encode('utf-8')
+        self.send_answer(200, 'application/json', body, {'ETag': etag})
+
+    def send_answer(self, status, content_type=None, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class RetrieveComponentsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), WeblateHandler)
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/api/' % self.server.server_address[1]
+        self.directory = tempfile.TemporaryDirectory()
+        self.manifest_file = os.path.join(self.directory.name, 'manifest.json')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.directory.cleanup()
+
+    def test_pages_revalidated(self):
+        manifest = ComponentManifest(self.manifest_file)
+        components = retrieve_components(['xwiki-platform'], self.url, manifest=manifest)
+        self.assertEqual([entry["template"] for entry in components['xwiki-platform']],
+                         [component["template"] for component in COMPONENTS['xwiki-platform']])
+        self.assertEqual(components['xwiki-platform'][1], {"branch": "master", "template": None, "languages": None})
+        self.assertEqual(sorted(page for _, page, _ in self.server.requests), [1, 2, 3])
+        manifest.save()
+
+        # Outdated manifest: the pages are not modified
+        self.server.requests = []
+        manifest = ComponentManifest(self.manifest_file)
+        self.assertEqual(retrieve_components(['xwiki-platform'], self.url, manifest=manifest, ttl=0), components)
+        self.assertEqual(sorted(self.server.requests),
+                         [('xwiki-platform', page, '"xwiki-platform-%d"' % page) for page in [1, 2, 3]])
+
+    def test_invalid_answer(self):
+        manifest = ComponentManifest(self.manifest_file)
+        cached_pages = [{"etag": None, "last_modified": None, "count": 1, "next": None,
+                         "results": [{"branch": "master", "template": "e/E.xml", "languages": "e/E.*.xml"}]}]
+        manifest.set_pages(self.url + 'projects/broken/components/?format=json', cached_pages)
+        components = retrieve_components(['broken', 'unknown'], self.url, manifest=manifest, ttl=0)
+        self.assertEqual(components, {'broken': cached_pages[0]["results"], 'unknown': []})
+
+    def test_output_without_template(self):
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'retrieve_components.py')
+        for options, expected in [([], 'a/A.properties\nc/C.xml\nd/D.properties\n'),
+                                  (['--languages'], 'a/A.properties\ta/A_*.properties\nc/C.xml\tc/C.*.xml\n'
+                                                    'd/D.properties\td/D_*.properties\n'),
+                                  (['--files'], '')]:
+            output = subprocess.run([sys.executable, script, 'xwiki-platform', 'master', '--url', self.url,
+                                     '--no-manifest'] + options, stdout=subprocess.PIPE, check=True,
+                                    cwd=self.directory.name, universal_newlines=True).stdout
+            self.assertEqual(output, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+
+## Tests of translation_changes.py on a small git repository (run with python3 -m unittest test_translation_changes).
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+
+from retrieve_components import WEBLATE_REST_API_URL, WEBLATE_REST_API_COMPONENTS_PATH
+from translation_changes import count_all_changes, list_translation_changes
+
+# Contents of the files in both commits, and the number of changes found (which the former count of the added
+# property lines of the diff, given in comment, differs from)
+FILES = [
+    ('src/A.properties', 'a=one\nb=two\n', 'a=one\nb=two\nc=three\n', None),
+    # Reordered keys (1)
+    ('src/A_fr.properties', 'a=un\nb=deux\n', 'b=deux\na=un\n', 0),
+    # Key continued on several lines and duplicated key (4)
+    ('src/A_de.properties', 'a=eins\n', 'a=eins\nb=zwei \\\n  drei=3\nc=vier\nc=vier\n', 2),
+    # Formatting change (1)
+    ('src/A_es.properties', 'a=uno\n', 'a = uno\n', 0),
+    # Deprecated key (0)
+    ('src/A_it.properties', 'a=uno\n', 'a=uno\n#@deprecated#b=due\n', 0),
+    # Modified value (1)
+    ('src/A_pt.properties', 'a=um\n', 'a=uma\n', 1),
+]
+
+class TranslationChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.current_directory = os.getcwd()
+        os.chdir(self.directory.name)
+        self.git('init', '-q')
+        os.mkdir('src')
+        self.start_commit = self.commit(1)
+        self.end_commit = self.commit(2)
+        self.manifest_file = os.path.join(self.directory.name, 'manifest.json')
+        with open(self.manifest_file, 'w') as f:
+            json.dump({"version": 1, "projects": {
+                WEBLATE_REST_API_URL + WEBLATE_REST_API_COMPONENTS_PATH % 'project': {"validated": time.time(), "pages": [
+                    {"etag": None, "last_modified": None, "count": 1, "next": None, "results": [
+                        {"branch": "master", "template": "src/A.properties", "languages": "src/A_*.properties"}]}]}}}, f)
+
+    def tearDown(self):
+        os.chdir(self.current_directory)
+        self.directory.cleanup()
+
+    def git(self, *arguments):
+        return subprocess.check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com']
+                                       + list(arguments)).decode().strip()
+
+    def commit(self, version):
+        for file_name, *contents, _ in FILES:
+            with open(file_name, 'w') as f:
+                f.write(contents[version - 1])
+        self.git('add', '.')
+        self.git('commit', '-q', '-m', 'version %d' % version)
+        return self.git('rev-parse', 'HEAD')
+
+    def test_count_changes(self):
+        file_names = [file_name for file_name, _, _, changes in FILES if changes is not None]
+        self.assertEqual(count_all_changes(file_names, self.start_commit, self.end_commit),
+                         {file_name: changes for file_name, _, _, changes in FILES if changes is not None})
+
+    def test_report(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            list_translation_changes('project', 'master', self.start_commit, self.end_commit,
+                                     manifest_file=self.manifest_file)
+        self.assertEqual(output.getvalue(), '\n'
+                                            '  Checking translation [src/A_de.properties]...\n'
+                                            '    FOUND CHANGES: 2\n'
+                                            '\n'
+                                            '  Checking translation [src/A_pt.properties]...\n'
+                                            '    FOUND CHANGES: 1\n'
+                                            '\n'
+                                            '[REPORT]\n'
+                                            '\n'
+                                            'Updated translation files (2):\n'
+                                            'src/A_de.properties\n'
+                                            'src/A_pt.properties\n'
+                                            '\n'
+                                            'Updated languages (2):\n'
+                                            'de\n'
+                                            'pt\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+
+## Tests of translation_coverage.py (run with python3 -m unittest test_translation_coverage).
+
+import os
+import tempfile
+import unittest
+
+from common import FileType
+from translation_coverage import compute_coverage, create_report, find_base_files
+
+BASE_DOCUMENT = ('a=one\n'
+                 'b=two \\\n'
+                 '  lines\n'
+                 'empty=\n'
+                 'c=three\n'
+                 'd=four\n'
+                 'notranslationsmarker=\n'
+                 'e=not translated\n')
+TRANSLATIONS = {
+    # Continued and deprecated values are translated, empty ones are not
+    'fr': 'a=un\nb=\\\n  deux\n#@deprecated#c=trois\nd=\n',
+    'de': 'a=eins\nx=unknown\n',
+}
+
+class TranslationCoverageTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.write('src/Base.properties', BASE_DOCUMENT)
+        for language, document in TRANSLATIONS.items():
+            self.write('src/Base_%s.properties' % language, document)
+        self.write('src/Other.properties', 'z=1\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, text):
+        file_name = os.path.join(self.directory.name, path)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with open(file_name, 'w', encoding='ISO-8859-1') as f:
+            f.write(text)
+
+    def test_coverage(self):
+        base_files = find_base_files(self.directory.name)
+        base_file = os.path.join(self.directory.name, 'src', 'Base.properties')
+        # The properties files without translation are not translation files
+        self.assertEqual(base_files, [(base_file, FileType.PROPERTIES, [
+            ('de', os.path.join(self.directory.name, 'src', 'Base_de.properties')),
+            ('fr', os.path.join(self.directory.name, 'src', 'Base_fr.properties'))])])
+        keys, translated = compute_coverage(*base_files[0])
+        self.assertEqual((keys, translated), (4, {'de': 1, 'fr': 3}))
+
+        report = create_report([('project', 'src/Base.properties', keys, translated),
+                                ('project', 'src/Empty.properties', 0, {'fr': 0})])
+        self.assertEqual(report['languages'], ['de', 'fr'])
+        self.assertEqual(report['components'][0]['languages'],
+                         {'de': {'translated': 1, 'percentage': 25.0}, 'fr': {'translated': 3, 'percentage': 75.0}})
+        self.assertEqual(report['components'][1]['languages'], {'fr': {'translated': 0, 'percentage': 100.0}})
+        self.assertEqual(report['total'], {'keys': 4, 'languages': {
+            'de': {'translated': 1, 'percentage': 25.0}, 'fr': {'translated': 3, 'percentage': 75.0}}})
+
+if __name__ == '__main__':
+    unittest.main()
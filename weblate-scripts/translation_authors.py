@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Output the authors and co-authors of the commits modifying the given paths (or git pathspec globs) since a date,
+## as computeAuthors of apply_translations.sh does for each path, but reading the git history only once.
+
+import argparse
+import fnmatch
+import os
+import subprocess
+import sys
+
+from collections import defaultdict
+
+COMMIT_SEPARATOR = '\x1e'
+FIELD_SEPARATOR = '\x1f'
+# Same author lines as computeAuthors
+AUTHOR_FORMAT = '%an <%ae> %+(trailers:key=Co-authored-by,only=true,valueonly=true,unfold=true)'
+WILDCARDS = ('*', '?', '[')
+
+class AuthorIndex(object):
+    """Author lines of the commits since a date, and the commits modifying each path"""
+    def __init__(self):
+        self.commit_authors = {}
+        self.path_commits = defaultdict(set)
+        self.directory_paths = defaultdict(list)
+
+    def load(self, since, git_directory=None):
+        """Read the commits since the given date with a single git log"""
+        command = ['git'] + (['-C', git_directory] if git_directory else []) +\
+            ['-c', 'core.quotePath=false', 'log', '--since=' + since, '--name-only',
+             '--pretty=format:' + COMMIT_SEPARATOR + '%H' + FIELD_SEPARATOR + AUTHOR_FORMAT + FIELD_SEPARATOR]
+        output = subprocess.check_output(command).decode('utf-8', errors='replace')
+        for record in output.split(COMMIT_SEPARATOR)[1:]:
+            commit, authors, paths = record.split(FIELD_SEPARATOR, 2)
+            self.commit_authors[commit] = authors.split('\n')
+            for path in paths.split('\n'):
+                if path:
+                    if path not in self.path_commits:
+                        self.directory_paths[os.path.dirname(path)].append(path)
+                    self.path_commits[path].add(commit)
+
+    def get_paths(self, pattern):
+        """Get the modified paths matching the pathspec glob, where wildcards also match slashes"""
+        if not any(wildcard in pattern for wildcard in WILDCARDS):
+            return [pattern] if pattern in self.path_commits else []
+        directory = os.path.dirname(pattern)
+        if any(wildcard in directory for wildcard in WILDCARDS):
+            candidates = self.path_commits.keys()
+        else:
+            candidates = [path for subdirectory, paths in self.directory_paths.items()
+                          if subdirectory == directory or subdirectory.startswith(directory + '/')
+                          for path in paths]
+        return [path for path in candidates if fnmatch.fnmatchcase(path, pattern)]
+
+    def get_authors(self, pattern):
+        """Get the sorted author lines of the commits modifying the paths matching the pattern"""
+        commits = set()
+        for path in self.get_paths(pattern):
+            commits.update(self.path_commits[path])
+        return sorted(set(line for commit in commits for line in self.commit_authors[commit]))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Output the authors of the commits modifying the given paths since '
+        'a date, the authors of each path being sorted.')
+    parser.add_argument('since', help='Date of the oldest commits to consider')
+    parser.add_argument('patterns', metavar='pattern', nargs='*', help='Path or git pathspec glob (read from the '
+        'standard input if none is given)')
+    parser.add_argument('-C', dest='git_directory', help='Directory of the git repository')
+    args = parser.parse_args()
+    return args.since, args.patterns or sys.stdin.read().splitlines(), args.git_directory
+
+def main():
+    """Main function"""
+    since, patterns, git_directory = parse_arguments()
+    index = AuthorIndex()
+    index.load(since, git_directory)
+    for pattern in patterns:
+        for line in index.get_authors(pattern):
+            print(line)
+
+if __name__ == '__main__':
+    main()
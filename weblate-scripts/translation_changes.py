@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## List the translation files modified between two commits, as list_translation_changes.sh does.
+## The files of both commits are read through a single git process and their keys are compared in parallel.
+## The changes found in a file are the keys added or modified, where list_translation_changes.sh used to count the
+## lines looking like added properties in the diff: reordered keys are no longer counted, a key duplicated or
+## continued on several lines counts once, and the deprecated keys and formatting changes are still ignored.
+
+import argparse
+import difflib
+import glob
+import io
+import os
+import re
+import subprocess
+import sys
+import threading
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from common import XmlFile, PropertiesFile, FileType, join_continued_lines
+from retrieve_components import retrieve_components, ComponentManifest, WEBLATE_REST_API_URL, DEFAULT_MANIFEST_FILE
+
+# Same as the lines counted by list_translation_changes.sh in the diff of the files that are not translations
+ADDED_PROPERTY_LINE_PATTERN = re.compile(r'^\+[^#+]+=')
+PROPERTIES_LANGUAGE_PATTERN = re.compile(r'.*/[^_]+_(.*)\.properties')
+
+KeyChanges = namedtuple('KeyChanges', ['added', 'removed', 'modified'])
+
+def read_blobs(object_names, git_directory=None):
+    """
+    Generate the content of each object (e.g. commit:path) in order, or None if it doesn't exist, using a single
+    git cat-file process.
+    """
+    command = ['git'] + (['-C', git_directory] if git_directory else []) + ['cat-file', '--batch']
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    # Write the names from another thread so that none of the pipes gets full
+    def write_names():
+        try:
+            for object_name in object_names:
+                process.stdin.write(object_name.encode('utf-8') + b'\n')
+        finally:
+            process.stdin.close()
+    writer = threading.Thread(target=write_names)
+    writer.start()
+    try:
+        for object_name in object_names:
+            header = process.stdout.readline()
+            if not header:
+                raise RuntimeError('git cat-file stopped before reading ' + object_name)
+            parts = header.split()
+            if len(parts) != 3 or header.endswith((b' missing\n', b' ambiguous\n')):
+                yield None
+                continue
+            size = int(parts[2])
+            content = process.stdout.read(size)
+            process.stdout.read(1)
+            yield content
+    finally:
+        writer.join()
+        process.stdout.close()
+        process.wait()
+
+def get_properties(document):
+    """Get the properties of the document, ignoring the deprecated ones like list_translation_changes.sh"""
+    lines = join_continued_lines(PropertiesFile.split_lines(document))
+    properties = PropertiesFile()
+    properties.load(''.join(line for line in lines if not line.lstrip().startswith('#@deprecated#')), warn=False)
+    return properties.properties
+
+def get_key_changes(old_properties, new_properties):
+    added = sum(1 for key in new_properties if key not in old_properties)
+    removed = sum(1 for key in old_properties if key not in new_properties)
+    modified = sum(1 for key, value in new_properties.items()
+                   if key in old_properties and old_properties[key] != value)
+    return KeyChanges(added, removed, modified)
+
+def count_added_lines(old_document, new_document):
+    """Count the lines looking like properties added by the diff, for the files that are not translations"""
+    diff = difflib.unified_diff(old_document.splitlines(), new_document.splitlines(), lineterm='', n=0)
+    return sum(1 for line in diff if ADDED_PROPERTY_LINE_PATTERN.match(line))
+
+def get_document(file_name, content):
+    if content is None:
+        return ''
+    if file_name.endswith('.properties'):
+        return content.decode('ISO-8859-1')
+    return content.decode('utf-8', errors='replace')
+
+def get_translation_document(document):
+    xml = XmlFile()
+    xml.document = document
+    return xml.get_tag_content('content')
+
+def count_changes(file_name, old_content, new_content):
+    """Get the number of keys added or modified between the two contents of the file (None if missing)"""
+    old_document, new_document = get_document(file_name, old_content), get_document(file_name, new_content)
+    if file_name.endswith('.xml'):
+        if not FileType.has_translation_marker(io.BytesIO(new_content or old_content or b'')):
+            return count_added_lines(old_document, new_document)
+        old_document, new_document = get_translation_document(old_document), get_translation_document(new_document)
+    changes = get_key_changes(get_properties(old_document), get_properties(new_document))
+    return changes.added + changes.modified
+
+def count_all_changes(file_names, start_commit, end_commit, jobs=None):
+    """Get the number of keys added or modified in each file between the two commits"""
+    object_names = []
+    for file_name in file_names:
+        object_names.extend((start_commit + ':' + file_name, end_commit + ':' + file_name))
+    contents = list(read_blobs(object_names))
+    changed = [(file_name, contents[2 * index], contents[2 * index + 1]) for index, file_name in enumerate(file_names)
+               if contents[2 * index] != contents[2 * index + 1]]
+    counts = dict.fromkeys(file_names, 0)
+    if changed:
+        with ProcessPoolExecutor(jobs) as executor:
+            for (file_name, _, _), count in zip(changed, executor.map(count_changes, *zip(*changed),
+                                                                      chunksize=max(1, len(changed) // 64))):
+                counts[file_name] = count
+    return counts
+
+def get_language(file_name):
+    if file_name.endswith('.xml'):
+        return file_name.split('.')[1] if '.' in file_name else ''
+    return PROPERTIES_LANGUAGE_PATTERN.sub(r'\1', file_name)
+
+def show_diff(start_commit, end_commit, file_name):
+    sys.stdout.flush()
+    ## Use --no-pager to not block the execution.
+    subprocess.call(['git', '--no-pager', 'diff', '--color=always', start_commit + '..' + end_commit, '--', file_name])
+
+def list_translation_changes(project, branch, start_commit, end_commit, verbose=False, diff=False, diff_all=False,
+                             jobs=None, api_url=WEBLATE_REST_API_URL, manifest_file=DEFAULT_MANIFEST_FILE):
+    manifest = ComponentManifest(manifest_file)
+    entries = [entry for entry in retrieve_components([project], api_url, manifest=manifest)[project]
+               if entry['branch'] == branch]
+    manifest.save()
+    files_by_template = [(entry['template'], sorted(glob.glob(entry['languages']))
+                          if entry['languages'] and os.path.isfile(entry['template']) else [])
+                         for entry in entries]
+    counts = count_all_changes([file_name for _, file_names in files_by_template for file_name in file_names],
+                               start_commit, end_commit, jobs)
+
+    updated_translations = []
+    updated_languages = set()
+    for template, file_names in files_by_template:
+        if verbose:
+            print("Checking file [{}]...".format(template))
+        for file_name in file_names:
+            if verbose:
+                print("  Checking translation [{}]...".format(file_name))
+            if counts[file_name] > 0:
+                ## Print the checked translation file only when it contains modifications and if verbose mode is not
+                ## already enabled.
+                if not verbose:
+                    print()
+                    print("  Checking translation [{}]...".format(file_name))
+                print("    FOUND CHANGES: {}".format(counts[file_name]))
+                updated_translations.append(file_name)
+                updated_languages.add(get_language(file_name))
+                if diff or diff_all:
+                    show_diff(start_commit, end_commit, file_name)
+            elif diff_all:
+                show_diff(start_commit, end_commit, file_name)
+
+    print()
+    print("[REPORT]")
+    print()
+    print("Updated translation files ({}):".format(len(updated_translations)))
+    print('\n'.join(updated_translations))
+    print()
+    print("Updated languages ({}):".format(len(updated_languages)))
+    print('\n'.join(sorted(updated_languages)))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='List the translation files modified between two commits.')
+    parser.add_argument('project', help='Weblate project of the current repository')
+    parser.add_argument('branch', help='Branch of the Weblate components')
+    parser.add_argument('start_commit', help='The git commit/tag ID to compare from')
+    parser.add_argument('end_commit', help='The git commit/tag ID to compare to')
+    parser.add_argument('--diff', action='store_true', help='Include the diff on each translated file that was '
+        'modified')
+    parser.add_argument('--diffAll', dest='diff_all', action='store_true', help='Include the diff on each translated '
+        'file, including the ones with formatting changes only')
+    parser.add_argument('--verbose', action='store_true', help='List each checked translation file')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of processes comparing the files')
+    parser.add_argument('--url', default=WEBLATE_REST_API_URL, help='Weblate REST API URL')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST_FILE, help='Local manifest of the components')
+    return parser.parse_args()
+
+def main():
+    """Main function"""
+    args = parse_arguments()
+    list_translation_changes(args.project, args.branch, args.start_commit, args.end_commit, args.verbose, args.diff,
+                             args.diff_all, args.jobs, args.url, args.manifest)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+# ---------------------------------------------------------------------------
+# See the NOTICE file distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of
+# the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this software; if not, write to the Free
+# Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301 USA, or see the FSF site: http://www.fsf.org.
+# ---------------------------------------------------------------------------
+
+## Report the percentage of translated keys of each base translation file of some directory trees, in each
+## language. A key is translated when it has a value in the language file, as PropertiesFile.replace_with considers
+## it (otherwise marking it as missing).
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from common import XmlFile, PropertiesFile, FileType, join_continued_lines
+from key_index import get_base_file
+
+def read_document(file_name, file_type):
+    """Get the properties of the file, which are the content of the translation pages"""
+    if file_type == FileType.PROPERTIES:
+        with open(file_name, "r", encoding="ISO-8859-1") as f:
+            return f.read()
+    xml = XmlFile()
+    xml.load(file_name)
+    return xml.get_tag_content('content')
+
+def get_translatable_keys(document):
+    """Get the keys of the base document taken from the language files by replace_with"""
+    keys = []
+    for line in join_continued_lines(PropertiesFile.split_lines(document)):
+        match = PropertiesFile.ANY_PROPERTY_PATTERN.match(line.strip())
+        if match:
+            key, value = match.group(1).strip(), match.group(2).strip()
+            if key == 'notranslationsmarker':
+                break
+            if value:
+                keys.append(key)
+    return keys
+
+def get_translated_keys(document):
+    """Get the keys having a value in the language document, including the deprecated ones"""
+    properties = PropertiesFile()
+    properties.load(document, warn=False)
+    return set(key for key, value in properties.properties.items() if value)
+
+def compute_coverage(base_file, file_type, language_files):
+    """Get the number of translatable keys of the base file and the number of them translated in each language"""
+    keys = get_translatable_keys(read_document(base_file, file_type))
+    translated = {}
+    for language, file_name in language_files:
+        translated_keys = get_translated_keys(read_document(file_name, file_type))
+        translated[language] = sum(1 for key in keys if key in translated_keys)
+    return len(keys), translated
+
+def find_base_files(directory, jobs=None):
+    """
+    Get the base translation files of the directory tree with their (language, file) translations.
+    The properties files without any translation are not considered as translation files.
+    """
+    file_types = FileType.get_file_types(directory, jobs)
+    paths = set(file_types)
+    translations = defaultdict(list)
+    language_files = set()
+    for file_name, file_type in file_types.items():
+        if file_type != FileType.UNDEFINED:
+            base_file, language = get_base_file(file_name, paths)
+            # The translations of a page usually don't hold the translation object
+            base_type = FileType.PROPERTIES if file_type == FileType.PROPERTIES else FileType.XML_PROPERTIES
+            if language and file_types[base_file] == base_type:
+                translations[base_file].append((language, file_name))
+                language_files.add(file_name)
+    base_files = []
+    for file_name, file_type in sorted(file_types.items()):
+        if file_name not in language_files and (file_type == FileType.XML_PROPERTIES
+                                                or (file_type == FileType.PROPERTIES and translations[file_name])):
+            base_files.append((file_name, file_type, sorted(translations[file_name])))
+    return base_files
+
+def compute_all_coverages(directories, jobs=None):
+    """Get the coverage of the base files of all the directory trees, computed in parallel"""
+    components = []
+    for directory in directories:
+        project = os.path.basename(os.path.abspath(directory))
+        for base_file, file_type, language_files in find_base_files(directory, jobs):
+            components.append((project, os.path.relpath(base_file, directory), base_file, file_type, language_files))
+    with ProcessPoolExecutor(jobs) as executor:
+        coverages = executor.map(compute_coverage, *zip(*[component[2:] for component in components]),
+                                 chunksize=max(1, len(components) // 256)) if components else []
+        return [(project, file_name, keys, translated)
+                for (project, file_name, _, _, _), (keys, translated) in zip(components, coverages)]
+
+def get_percentage(translated, keys):
+    return round(100.0 * translated / keys, 1) if keys else 100.0
+
+def create_report(coverages):
+    """Get the coverage of each component and the total coverage in each language"""
+    languages = sorted(set(language for _, _, _, translated in coverages for language in translated))
+    total_keys = sum(keys for _, _, keys, _ in coverages)
+    total_translated = defaultdict(int)
+    components = []
+    for project, file_name, keys, translated in coverages:
+        components.append({
+            "project": project,
+            "file": file_name,
+            "keys": keys,
+            "languages": {language: {"translated": count, "percentage": get_percentage(count, keys)}
+                          for language, count in sorted(translated.items())}
+        })
+        for language, count in translated.items():
+            total_translated[language] += count
+    return {
+        "languages": languages,
+        "components": components,
+        "total": {
+            "keys": total_keys,
+            "languages": {language: {"translated": total_translated[language],
+                                     "percentage": get_percentage(total_translated[language], total_keys)}
+                          for language in languages}
+        }
+    }
+
+def write_csv(report, output):
+    """Write the matrix of the percentages, a language missing for a component being untranslated"""
+    writer = csv.writer(output)
+    writer.writerow(["project", "file", "keys"] + report["languages"])
+    for component in report["components"]:
+        writer.writerow([component["project"], component["file"], component["keys"]]
+                        + [component["languages"][language]["percentage"] if language in component["languages"]
+                           else get_percentage(0, component["keys"]) for language in report["languages"]])
+    total = report["total"]
+    writer.writerow(["total", "", total["keys"]]
+                    + [total["languages"][language]["percentage"] for language in report["languages"]])
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Report the translation coverage of each base translation file '
+        'of the given directories, in each language.')
+    parser.add_argument('directories', metavar='directory', nargs='*', default=['.'], help='Directory trees to '
+        'analyze, named after their project (default is the current directory)')
+    parser.add_argument('-f', '--format', choices=['json', 'csv'], default='json', help='Output format (default is '
+        'json)')
+    parser.add_argument('-o', '--output', metavar='file', help='Output file (default is the standard output)')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, help='Number of processes parsing the files')
+    return parser.parse_args()
+
+def main():
+    """Main function"""
+    args = parse_arguments()
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            sys.exit('The directory {} does not exist'.format(directory))
+    report = create_report(compute_all_coverages(args.directories, args.jobs))
+    output = open(args.output, "w", newline='') if args.output else sys.stdout
+    try:
+        if args.format == 'csv':
+            write_csv(report, output)
+        else:
+            json.dump(report, output, indent=2)
+            output.write('\n')
+    finally:
+        if args.output:
+            output.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,36 @@
 #!/usr/bin/env python3
 import os.path
 import os
+import json
 import subprocess
 
 import requests
 import argparse
 import re
+import sqlite3
+import sys
+import threading
+import time
 import datetime as dt
 
+from contextlib import redirect_stdout
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
 WEBLATE_TOKEN_FILE="~/.weblate_token"
+CHANGE_STORE_FILE = "~/.cache/xwiki-weblate-changes.sqlite"
 WEBLATE_REST_API_ENDPOINT = "https://l10n.xwiki.org/api/"
 WEBLATE_CHANGES_ENDPOINT = WEBLATE_REST_API_ENDPOINT + "changes/"
 XWIKI_PROJECTS_SLUG = ['xwiki-platform', 'xwiki-commons', 'xwiki-rendering']
 BRANCH_PATTERN = re.compile('stable-\\d+\\.(?P<minor>\\d+)\\.x')
 VERSION_PATTERN = re.compile('^(?P<major>\\d+)\\.(?P<minor>\\d+).*')
-GITHUB_TAG_ENDPOINT = "https://api.github.com/repos/xwiki/xwiki-platform/git/matching-refs/tags/"
+GITHUB_TAG_ENDPOINT = "https://api.github.com/repos/{}/git/matching-refs/tags/"
+GITHUB_REPOSITORY_PATTERN = re.compile('github\\.com[/:](?P<repository>[^/]+/[^/]+?)(\\.git)?/?$')
+DEFAULT_REPOSITORY = "https://github.com/xwiki/xwiki-platform"
+MAX_CONCURRENT_REQUESTS = 8
+## List of actions can be found in https://github.com/WeblateOrg/weblate/blob/main/weblate/trans/actions.py#L16
+TRANSLATION_ACTIONS = [2, 5] ## 2 is translation changed and 5 is translation added
 
 BRANCH_MASTER = 'master'
 BRANCH_LTS = 'lts'
@@ -25,39 +41,94 @@ def get_token_header(token):
         return {'Authorization': 'Token {}'.format(token)}
     return None
 
-def retrieve_changes_from_url_and_get_language(url, payload, inspected_translations, branch, languages, projects,
-                                               token):
-    response = requests.get(url, payload, headers=get_token_header(token))
-    response.raise_for_status()
-    json = response.json()
-    if payload:
-        print("Found a total of {} results from Weblate API for translation changes.".format(json['count']))
-        print("{} authorized requests remaining to Weblate REST API - Reset to {} in {} seconds".format(
-            response.headers['X-RateLimit-Remaining'],
-            response.headers['X-RateLimit-Limit'],
-            response.headers['X-RateLimit-Reset']))
-    for result in json['results']:
-        count_language_if_needed(result, inspected_translations, branch, languages, projects, token)
-    if json['next']:
-        retrieve_changes_from_url_and_get_language(json['next'], None, inspected_translations, branch, languages,
-                                                   projects, token)
-
-def count_language_if_needed(result, inspected_translations, branch, languages, projects, token):
-    if result['translation'] not in inspected_translations:
-        print("Inspecting change: {} about translation {}".format(result['url'], result['translation']))
-        response = requests.get(result['translation'], headers=get_token_header(token))
+class WeblateClient:
+    """
+    Pooled session to the Weblate REST API, shared by concurrent threads.
+    The requests are paced according to the rate limit headers of the answers: once fewer requests than
+    the number of threads remain, they are spread until the reset of the limit, instead of failing.
+    """
+    def __init__(self, token=None, pool_size=MAX_CONCURRENT_REQUESTS):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(get_token_header(token) or {})
+        self.margin = pool_size
+        self.lock = threading.Lock()
+        self.remaining = None
+        self.reset_time = None
+        self.next_request_time = 0
+
+    def wait_for_quota(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.remaining is None or self.reset_time is None or self.reset_time <= now:
+                delay = 0
+            elif self.remaining <= 0:
+                delay = self.reset_time - now
+            elif self.remaining <= self.margin:
+                delay = max(0, self.next_request_time - now)
+                self.next_request_time = now + delay + (self.reset_time - now) / self.remaining
+            else:
+                delay = 0
+            if self.remaining is not None:
+                self.remaining -= 1
+        if delay > 0:
+            time.sleep(delay)
+
+    def update_rate_limit(self, response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        with self.lock:
+            self.remaining = int(remaining)
+            self.reset_time = time.monotonic() + int(reset)
+
+    def get(self, url, params=None):
+        """Get the JSON answer of the URL, waiting for the rate limit to be reset if needed"""
+        while True:
+            self.wait_for_quota()
+            response = self.session.get(url, params=params)
+            self.update_rate_limit(response)
+            if response.status_code != 429:
+                break
+            retry_after = response.headers.get('Retry-After')
+            with self.lock:
+                self.remaining = 0
+                if retry_after and retry_after.isdigit():
+                    self.reset_time = time.monotonic() + int(retry_after)
+                elif self.reset_time is None or self.reset_time <= time.monotonic():
+                    self.reset_time = time.monotonic() + 1
+            print("Rate limit of Weblate REST API exceeded, waiting before retrying {}".format(url))
         response.raise_for_status()
-        json = response.json()
-        if not is_matching_branch(json['component']['branch'], branch):
-            print("Change ignored: branch {} not matching with {}".format(json['component']['branch'], branch))
-        elif json['component']['project']['slug'] not in projects:
-            print("Change ignored: project {} not found in {}".format(json['component']['project']['slug'], projects))
-        elif json['language_code'] in languages:
-            print("Change ignored: language {} already found".format(json['language_code']))
-        else:
-            print("Language added: " + json['language_code'])
-            languages.append(json['language_code'])
-        inspected_translations.append(result['translation'])
+        return response, response.json()
+
+def retrieve_changes(client, executor, url, payload):
+    """
+    Get the pages of changes in order. The first page gives the number of pages, which are then requested
+    concurrently.
+    """
+    response, json = client.get(url, payload)
+    print("Found a total of {} results from Weblate API for translation changes.".format(json['count']))
+    print("{} authorized requests remaining to Weblate REST API - Reset to {} in {} seconds".format(
+        response.headers.get('X-RateLimit-Remaining'),
+        response.headers.get('X-RateLimit-Limit'),
+        response.headers.get('X-RateLimit-Reset')))
+    yield json
+    page_size = len(json['results'])
+    if not json['next'] or not page_size:
+        return
+    if not json.get('count'):
+        # Unknown number of pages: follow the links
+        while json['next']:
+            response, json = client.get(json['next'])
+            yield json
+        return
+    page_count = (json['count'] + page_size - 1) // page_size
+    futures = [executor.submit(client.get, url, dict(payload, page=page)) for page in range(2, page_count + 1)]
+    for future in futures:
+        yield future.result()[1]
 
 def is_matching_branch(json_branch_value, branch):
     if branch == BRANCH_MASTER and json_branch_value == BRANCH_MASTER:
@@ -66,23 +137,188 @@ def is_matching_branch(json_branch_value, branch):
         match = BRANCH_PATTERN.match(json_branch_value)
         return match and branch == find_branch_from_minor(match.group('minor'))
 
-def retrieve_languages_for_changes(date_previous_version, date_next_version, branch, projects, token):
-    ## List of actions can be found in https://github.com/WeblateOrg/weblate/blob/main/weblate/trans/actions.py#L16
-    request_payload = {
-        'action': [2, 5], ## 2 is translation changed and 5 is translation added
-        'timestamp_after': date_previous_version,
-        'timestamp_before': date_next_version,
-    }
-    inspected_translations = []
-    languages = []
-    retrieve_changes_from_url_and_get_language(WEBLATE_CHANGES_ENDPOINT, request_payload, inspected_translations,
-                                               branch, languages, projects, token)
-    return sorted(languages)
+def normalize_timestamp(timestamp):
+    """Get the date (ISO 8601 string or datetime) as an UTC string that can be compared with other ones"""
+    if isinstance(timestamp, str):
+        timestamp = dt.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=dt.timezone.utc)
+    return timestamp.astimezone(dt.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+class ChangeStore:
+    """
+    Local SQLite copy of the Weblate translation changes and of the translations they are about.
+    The changes are known for a single time range, which is extended by retrieving only the missing changes.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS changes (
+            url TEXT PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            action INTEGER,
+            translation TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS changes_timestamp ON changes (timestamp);
+        CREATE TABLE IF NOT EXISTS translations (
+            url TEXT PRIMARY KEY,
+            language_code TEXT NOT NULL,
+            branch TEXT NOT NULL,
+            project TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS tag_dates (
+            repository TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            date TEXT NOT NULL,
+            PRIMARY KEY (repository, tag)
+        );
+        CREATE TABLE IF NOT EXISTS covered_range (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            timestamp_after TEXT NOT NULL,
+            timestamp_before TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, file_name=CHANGE_STORE_FILE):
+        file_name = os.path.expanduser(file_name)
+        directory = os.path.dirname(file_name)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(file_name)
+        self.connection.create_function('is_matching_branch', 2,
+                                        lambda json_branch_value, branch: bool(is_matching_branch(json_branch_value,
+                                                                                                  branch)))
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def get_covered_range(self):
+        return self.connection.execute("SELECT timestamp_after, timestamp_before FROM covered_range").fetchone()
+
+    def get_missing_ranges(self, timestamp_after, timestamp_before):
+        """Get the time ranges to retrieve so that the covered range contains the given one (up to now)"""
+        timestamp_before = min(timestamp_before, normalize_timestamp(dt.datetime.now(dt.timezone.utc)))
+        covered = self.get_covered_range()
+        if covered is None:
+            return [(timestamp_after, timestamp_before)] if timestamp_after < timestamp_before else []
+        ranges = []
+        if timestamp_after < covered[0]:
+            ranges.append((timestamp_after, covered[0]))
+        if timestamp_before > covered[1]:
+            ranges.append((covered[1], timestamp_before))
+        return ranges
+
+    def extend_covered_range(self, timestamp_after, timestamp_before):
+        covered = self.get_covered_range()
+        if covered:
+            timestamp_after = min(timestamp_after, covered[0])
+            timestamp_before = max(timestamp_before, covered[1])
+        self.connection.execute("INSERT OR REPLACE INTO covered_range VALUES (0, ?, ?)",
+                                (timestamp_after, timestamp_before))
+
+    def get_tag_date(self, repository, tag):
+        row = self.connection.execute("SELECT date FROM tag_dates WHERE repository = ? AND tag = ?",
+                                      (repository, tag)).fetchone()
+        return row[0] if row else None
+
+    def set_tag_date(self, repository, tag, date):
+        self.connection.execute("INSERT OR REPLACE INTO tag_dates VALUES (?, ?, ?)", (repository, tag, date))
+        self.connection.commit()
+
+    def add_changes(self, changes):
+        self.connection.executemany("INSERT OR IGNORE INTO changes VALUES (?, ?, ?, ?)",
+                                    [(change['url'], normalize_timestamp(change['timestamp']), change.get('action'),
+                                      change['translation']) for change in changes if change['translation']])
+
+    def get_unknown_translations(self, timestamp_after, timestamp_before):
+        """Get the URL of the translations changed in the given range for which there's no information"""
+        return [row[0] for row in self.connection.execute(
+            "SELECT DISTINCT changes.translation FROM changes "
+            "LEFT JOIN translations ON changes.translation = translations.url "
+            "WHERE translations.url IS NULL AND changes.timestamp BETWEEN ? AND ?",
+            (timestamp_after, timestamp_before))]
+
+    def add_translation(self, url, translation):
+        self.connection.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                                (url, translation['language_code'], translation['component']['branch'],
+                                 translation['component']['project']['slug']))
+
+    def sync(self, client, timestamp_after, timestamp_before, jobs=MAX_CONCURRENT_REQUESTS):
+        """Retrieve the missing changes of the given range and the translations they are about"""
+        timestamp_after = normalize_timestamp(timestamp_after)
+        timestamp_before = normalize_timestamp(timestamp_before)
+        with ThreadPoolExecutor(jobs) as executor:
+            for range_after, range_before in self.get_missing_ranges(timestamp_after, timestamp_before):
+                print("Retrieving translation changes between {} and {}".format(range_after, range_before))
+                request_payload = {
+                    'action': TRANSLATION_ACTIONS,
+                    'timestamp_after': range_after,
+                    'timestamp_before': range_before,
+                }
+                for page in retrieve_changes(client, executor, WEBLATE_CHANGES_ENDPOINT, request_payload):
+                    self.add_changes(page['results'])
+                self.extend_covered_range(range_after, range_before)
+                self.connection.commit()
+            unknown_translations = self.get_unknown_translations(timestamp_after, timestamp_before)
+            if unknown_translations:
+                print("Retrieving {} translations".format(len(unknown_translations)))
+            futures = [(url, executor.submit(client.get, url)) for url in unknown_translations]
+            for url, future in futures:
+                self.add_translation(url, future.result()[1])
+        self.connection.commit()
+
+    def get_languages(self, timestamp_after, timestamp_before, branch, projects):
+        """Get the languages of the translations changed in the given range for the branch and projects"""
+        query = ("SELECT DISTINCT translations.language_code FROM changes "
+                 "JOIN translations ON changes.translation = translations.url "
+                 "WHERE changes.timestamp BETWEEN ? AND ? AND is_matching_branch(translations.branch, ?) "
+                 "AND translations.project IN ({}) ORDER BY translations.language_code").format(
+                     ', '.join('?' * len(projects)))
+        parameters = [normalize_timestamp(timestamp_after), normalize_timestamp(timestamp_before), branch]
+        return [row[0] for row in self.connection.execute(query, parameters + list(projects))]
+
+    def get_languages_for_ranges(self, ranges, projects):
+        """
+        Get the languages of each (timestamp_after, timestamp_before, branch) range for the projects, reading the
+        changes of the whole time window covering all the ranges only once.
+        """
+        ranges = [(normalize_timestamp(after), normalize_timestamp(before), branch) for after, before, branch in ranges]
+        range_languages = [set() for _ in ranges]
+        query = ("SELECT changes.timestamp, translations.language_code, translations.branch FROM changes "
+                 "JOIN translations ON changes.translation = translations.url "
+                 "WHERE changes.timestamp BETWEEN ? AND ? AND translations.project IN ({})").format(
+                     ', '.join('?' * len(projects)))
+        parameters = [min(after for after, _, _ in ranges), max(before for _, before, _ in ranges)]
+        for timestamp, language_code, json_branch_value in self.connection.execute(query, parameters + list(projects)):
+            for (after, before, branch), languages in zip(ranges, range_languages):
+                if after <= timestamp <= before and language_code not in languages and\
+                        is_matching_branch(json_branch_value, branch):
+                    languages.add(language_code)
+        return [sorted(languages) for languages in range_languages]
+
+def retrieve_languages_for_changes(date_previous_version, date_next_version, branch, projects, token,
+                                   jobs=MAX_CONCURRENT_REQUESTS, store_file=CHANGE_STORE_FILE):
+    store = ChangeStore(store_file)
+    try:
+        store.sync(WeblateClient(token, jobs), date_previous_version, date_next_version, jobs)
+        return store.get_languages(date_previous_version, date_next_version, branch, projects)
+    finally:
+        store.close()
+
+def retrieve_languages_for_ranges(ranges, projects, token, jobs=MAX_CONCURRENT_REQUESTS,
+                                  store_file=CHANGE_STORE_FILE):
+    """Get the languages of each (date_previous_version, date_next_version, branch) range"""
+    store = ChangeStore(store_file)
+    try:
+        store.sync(WeblateClient(token, jobs), min(normalize_timestamp(after) for after, _, _ in ranges),
+                   max(normalize_timestamp(before) for _, before, _ in ranges), jobs)
+        return store.get_languages_for_ranges(ranges, projects)
+    finally:
+        store.close()
 
 def find_date_for_version(version, repository):
-    ## FIXME: only works for XS right now
-    tagName = "xwiki-platform-" + version
-    response = requests.get(GITHUB_TAG_ENDPOINT + tagName)
+    """Get the date of the version tag from the GitHub API (the repository being its owner/name)"""
+    tagName = get_repository_name(repository) + "-" + version
+    response = requests.get(GITHUB_TAG_ENDPOINT.format(repository) + tagName)
     response.raise_for_status()
     json = response.json()
     date = None
@@ -97,7 +333,76 @@ def find_date_from_tag(tagInfoUrl):
     response = requests.get(tagInfoUrl)
     response.raise_for_status()
     json = response.json()
-    return json['tagger']['date']
+    ## Lightweight tags directly reference a commit
+    return json['tagger']['date'] if 'tagger' in json else json['committer']['date']
+
+def get_repository_name(repository):
+    name = os.path.basename(repository.rstrip('/'))
+    return name[:-len('.git')] if name.endswith('.git') else name
+
+def get_git_command(git_directory):
+    return ['git', '-C', git_directory] if git_directory else ['git']
+
+class TagDateIndex:
+    """
+    Dates of the version tags of a repository, read from the local clone with a single git command. The
+    GitHub API is only requested for the tags missing from the clone, and its answers are kept in the store.
+    """
+    def __init__(self, repository, store_file=CHANGE_STORE_FILE):
+        ## The repository is either a URL, the clone being the current directory, or the path of the clone
+        self.git_directory = repository if os.path.isdir(repository) else None
+        self.name = get_repository_name(os.path.abspath(repository) if self.git_directory else repository)
+        self.github_repository = self.find_github_repository(repository)
+        self.store_file = store_file
+        self.dates = None
+
+    def find_github_repository(self, repository):
+        if self.git_directory:
+            try:
+                repository = subprocess.check_output(get_git_command(self.git_directory) +
+                                                     ['remote', 'get-url', 'origin'], text=True).strip()
+            except (OSError, subprocess.CalledProcessError):
+                return None
+        matcher = GITHUB_REPOSITORY_PATTERN.search(repository)
+        return matcher.group('repository') if matcher else None
+
+    def load(self):
+        """Read the date of all the tags of the clone"""
+        self.dates = {}
+        command = get_git_command(self.git_directory) + ['for-each-ref',
+                                                         '--format=%(refname:strip=2)%09%(creatordate:iso-strict)',
+                                                         'refs/tags']
+        try:
+            output = subprocess.check_output(command, text=True, stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError):
+            print("WARNING: Cannot read the tags of the local repository, using GitHub API instead.")
+            return
+        for line in output.splitlines():
+            tag, _, date = line.partition('\t')
+            if date:
+                self.dates[tag] = date
+
+    def get_date(self, version):
+        """Get the date of the version tag, or None if it cannot be found"""
+        if self.dates is None:
+            self.load()
+        tag = self.name + "-" + version
+        if tag in self.dates:
+            return self.dates[tag]
+        if not self.github_repository:
+            return None
+        store = ChangeStore(self.store_file)
+        try:
+            date = store.get_tag_date(self.github_repository, tag)
+            if not date:
+                print("Tag {} not found locally, using GitHub API.".format(tag))
+                date = find_date_for_version(version, self.github_repository)
+                if date:
+                    store.set_tag_date(self.github_repository, tag, date)
+        finally:
+            store.close()
+        self.dates[tag] = date
+        return date
 
 def find_branch_from_minor(minor_version):
     if minor_version == '4':
@@ -117,60 +422,118 @@ def load_token_from_file():
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Compute contributed languages from one version to another')
-    parser.add_argument('previous_version', metavar='previous_version', help='Previous version')
-    parser.add_argument('next_version', metavar='next_version', help='Next version')
+    parser.add_argument('versions', metavar='previous_version next_version', nargs='*',
+                        help='Previous and next versions, several pairs can be given')
+    parser.add_argument('-b', '--batch', metavar='batch_file', help='File listing a "previous_version next_version" '
+                                                                    'pair on each line')
     parser.add_argument('-p', '--project', metavar='project', help='Project name (default is xwiki)')
-    parser.add_argument('-r', '--repository', metavar='repository', help='Repository URL (mandatory when project '
-                                                                         'argument is used)')
+    parser.add_argument('-r', '--repository', metavar='repository', help='Repository URL, the current directory '
+                                                                         'being its clone, or path of its clone '
+                                                                         '(mandatory when project argument is used)')
     parser.add_argument('-t', '--token', metavar='token', help='Weblate token in case of authenticated request')
-    return parser.parse_args()
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help='Maximum number of concurrent requests to Weblate (default is {})'.format(
+                            MAX_CONCURRENT_REQUESTS))
+    parser.add_argument('-s', '--store', metavar='store_file', default=CHANGE_STORE_FILE,
+                        help='Local store of the Weblate changes, only completed with the missing ones '
+                             '(default is {})'.format(CHANGE_STORE_FILE))
+    parser.add_argument('-f', '--format', choices=['text', 'json'], default='text',
+                        help='Output format of the languages (the other messages are written on the error output '
+                             'with json)')
+    args = parser.parse_args()
+    if len(args.versions) % 2:
+        parser.error('the versions must be given by pairs')
+    args.version_pairs = list(zip(args.versions[0::2], args.versions[1::2]))
+    if args.batch:
+        args.version_pairs += read_batch(args.batch)
+    if not args.version_pairs:
+        parser.error('at least one pair of versions is required')
+    return args
+
+def read_batch(batch_file):
+    """Get the (previous_version, next_version) pairs listed in the batch file"""
+    if not os.path.isfile(batch_file):
+        sys.exit('The specified batch file is not a file')
+    version_pairs = []
+    with open(batch_file, "r") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split()
+            if len(parts) != 2:
+                sys.exit('Invalid version pair at line {} of the batch file'.format(number))
+            version_pairs.append(tuple(parts))
+    return version_pairs
 
-def find_branch_creation_date(branch_name):
-    command = "git show -s --format=%cd --date=iso8601 $(git merge-base {} master)".format(branch_name)
+def find_branch_creation_date(branch_name, git_directory=None):
+    git = ' '.join(get_git_command(git_directory))
+    command = "{0} show -s --format=%cd --date=iso8601 $({0} merge-base {1} master)".format(git, branch_name)
     result = subprocess.check_output(command, shell=True, text=True)
     return dt.datetime.fromisoformat(result.strip())
 
-def main():
-    args = parse_arguments()
-    previous_version = args.previous_version
-    next_version = args.next_version
-    current_directory = os.getcwd()
-
-    if args.project:
-        projects = [args.project]
-        if not args.repository:
-            raise RuntimeError("The repository is mandatory.")
-        repository = args.repository
-    else:
-        projects = XWIKI_PROJECTS_SLUG
-        repository = "https://github.com/xwiki/xwiki-platform"
+def find_range_for_versions(previous_version, next_version, tag_dates):
+    """Get the dates of the versions and the branch of the next one"""
     next_version_matcher = VERSION_PATTERN.match(next_version)
     if not next_version_matcher:
         raise RuntimeError("The version number is invalid.")
 
-    previous_version_date = find_date_for_version(previous_version, repository)
+    previous_version_date = tag_dates.get_date(previous_version)
     is_first_rc = next_version.endswith('-rc-1')
     if is_first_rc:
         branch = BRANCH_MASTER
         next_version_branch = "stable-{}.{}.x".format(next_version_matcher.group('major'), next_version_matcher.group('minor'))
-        next_version_date = find_branch_creation_date(next_version_branch)
+        next_version_date = find_branch_creation_date(next_version_branch, tag_dates.git_directory)
     else:
         branch = find_branch_from_minor(next_version_matcher.group('minor'))
-        next_version_date = find_date_for_version(next_version, repository)
+        next_version_date = tag_dates.get_date(next_version)
 
-    if not previous_version_date:
+    if not next_version_date:
         raise RuntimeError("Cannot find next version date")
     if not previous_version_date:
         raise RuntimeError("Cannot find previous version date")
     print("Start looking for translations between {} and {} on branch {} ".format(previous_version_date,
                                                                                next_version_date, branch))
-    token = args.token or load_token_from_file()
-    if not token:
-        print("WARNING: No Weblate token provided, the request will be performed with anonymous user which have a "
-              "limited rate.")
+    return previous_version_date, next_version_date, branch
 
-    languages = retrieve_languages_for_changes(previous_version_date, next_version_date, branch, projects, token)
-    print("Languages: \n%s" % ','.join(languages))
+def main():
+    args = parse_arguments()
+    current_directory = os.getcwd()
+
+    if args.project:
+        projects = [args.project]
+        if not args.repository:
+            raise RuntimeError("The repository is mandatory.")
+        repository = args.repository
+    else:
+        projects = XWIKI_PROJECTS_SLUG
+        repository = DEFAULT_REPOSITORY
+
+    with redirect_stdout(sys.stderr if args.format == 'json' else sys.stdout):
+        tag_dates = TagDateIndex(repository, args.store)
+        ranges = [find_range_for_versions(previous_version, next_version, tag_dates)
+                  for previous_version, next_version in args.version_pairs]
+        token = args.token or load_token_from_file()
+        if not token:
+            print("WARNING: No Weblate token provided, the request will be performed with anonymous user which have "
+                  "a limited rate.")
+        range_languages = retrieve_languages_for_ranges(ranges, projects, token, args.jobs, args.store)
+
+    if args.format == 'json':
+        print(json.dumps([{
+            'previous_version': previous_version,
+            'next_version': next_version,
+            'branch': branch,
+            'previous_version_date': normalize_timestamp(previous_version_date),
+            'next_version_date': normalize_timestamp(next_version_date),
+            'languages': languages
+        } for (previous_version, next_version), (previous_version_date, next_version_date, branch), languages
+            in zip(args.version_pairs, ranges, range_languages)], indent=2))
+    elif len(args.version_pairs) == 1:
+        print("Languages: \n%s" % ','.join(range_languages[0]))
+    else:
+        for (previous_version, next_version), languages in zip(args.version_pairs, range_languages):
+            print("Languages from {} to {}: \n{}".format(previous_version, next_version, ','.join(languages)))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
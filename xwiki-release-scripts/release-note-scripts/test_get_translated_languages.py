@@ -0,0 +1,115 @@
+## Tests of the local store of the Weblate changes (run with python3 -m unittest test_get_translated_languages).
+
+import contextlib
+import io
+import unittest
+
+from get_translated_languages import ChangeStore, WEBLATE_CHANGES_ENDPOINT
+
+CHANGES = [
+    {'url': 'change/1', 'timestamp': '2024-01-05T10:00:00Z', 'action': 2, 'translation': 'translation/fr'},
+    {'url': 'change/2', 'timestamp': '2024-02-05T10:00:00Z', 'action': 5, 'translation': 'translation/de'},
+    {'url': 'change/3', 'timestamp': '2024-03-05T10:00:00Z', 'action': 2, 'translation': 'translation/es'},
+    {'url': 'change/4', 'timestamp': '2024-03-06T10:00:00Z', 'action': 2, 'translation': None},
+]
+TRANSLATIONS = {
+    'translation/fr': {'language_code': 'fr', 'component': {'branch': 'master', 'project': {'slug': 'xwiki-platform'}}},
+    'translation/de': {'language_code': 'de', 'component': {'branch': 'master', 'project': {'slug': 'xwiki-platform'}}},
+    'translation/es': {'language_code': 'es', 'component': {'branch': 'master', 'project': {'slug': 'xwiki-commons'}}},
+}
+
+def timestamp(date):
+    return date + 'T00:00:00.000000Z'
+
+class FakeResponse:
+    headers = {}
+
+class FakeClient:
+    """Answer the changes of the requested range by pages of one change, and the translations"""
+    def __init__(self):
+        self.change_ranges = []
+        self.translations = []
+
+    def get(self, url, params=None):
+        if url in TRANSLATIONS:
+            self.translations.append(url)
+            return FakeResponse(), TRANSLATIONS[url]
+        self.check_url(url)
+        after, before = params['timestamp_after'], params['timestamp_before']
+        if 'page' not in params:
+            self.change_ranges.append((after, before))
+        changes = [change for change in CHANGES if after <= change['timestamp'].replace('Z', '.000000Z') <= before]
+        page = params.get('page', 1)
+        return FakeResponse(), {'count': len(changes), 'next': url if page < len(changes) else None,
+                                'results': changes[page - 1:page]}
+
+    def check_url(self, url):
+        if url != WEBLATE_CHANGES_ENDPOINT:
+            raise ValueError('Unexpected URL ' + url)
+
+class ChangeStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = ChangeStore(':memory:')
+        self.client = FakeClient()
+
+    def tearDown(self):
+        self.store.close()
+
+    def sync(self, after, before):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.store.sync(self.client, timestamp(after), timestamp(before))
+
+    def test_missing_ranges_without_covered_range(self):
+        self.assertEqual(self.store.get_missing_ranges(timestamp('2024-01-01'), timestamp('2024-02-01')),
+                         [(timestamp('2024-01-01'), timestamp('2024-02-01'))])
+        self.assertEqual(self.store.get_missing_ranges(timestamp('2024-02-01'), timestamp('2024-01-01')), [])
+
+    def test_missing_ranges(self):
+        self.store.extend_covered_range(timestamp('2024-02-01'), timestamp('2024-03-01'))
+        for after, before, expected in [
+                # Before and after the covered range, which has to stay contiguous
+                ('2024-01-01', '2024-01-15', [('2024-01-01', '2024-02-01')]),
+                ('2024-03-15', '2024-04-01', [('2024-03-01', '2024-04-01')]),
+                # Inside the covered range
+                ('2024-02-01', '2024-03-01', []),
+                ('2024-02-10', '2024-02-20', []),
+                # Overlapping the covered range
+                ('2024-01-15', '2024-02-15', [('2024-01-15', '2024-02-01')]),
+                ('2024-02-15', '2024-03-15', [('2024-03-01', '2024-03-15')]),
+                ('2024-01-15', '2024-03-15', [('2024-01-15', '2024-02-01'), ('2024-03-01', '2024-03-15')])]:
+            self.assertEqual(self.store.get_missing_ranges(timestamp(after), timestamp(before)),
+                             [(timestamp(range_after), timestamp(range_before)) for range_after, range_before in expected])
+
+    def test_missing_ranges_up_to_now(self):
+        self.store.extend_covered_range(timestamp('2024-02-01'), timestamp('2024-03-01'))
+        (range_after, range_before), = self.store.get_missing_ranges(timestamp('2024-02-15'), timestamp('9999-01-01'))
+        self.assertEqual(range_after, timestamp('2024-03-01'))
+        self.assertLess(range_before, timestamp('9999-01-01'))
+
+    def test_sync_extends_covered_range(self):
+        self.sync('2024-02-01', '2024-02-28')
+        self.assertEqual(self.client.change_ranges, [(timestamp('2024-02-01'), timestamp('2024-02-28'))])
+        self.assertEqual(self.store.get_languages(timestamp('2024-02-01'), timestamp('2024-02-28'), 'master',
+                                                  ['xwiki-platform']), ['de'])
+
+        # Only the missing parts are retrieved, on both sides of the covered range
+        self.client.change_ranges = []
+        self.sync('2024-01-01', '2024-03-31')
+        self.assertEqual(self.client.change_ranges, [(timestamp('2024-01-01'), timestamp('2024-02-01')),
+                                                     (timestamp('2024-02-28'), timestamp('2024-03-31'))])
+        self.assertEqual(self.store.get_covered_range(), (timestamp('2024-01-01'), timestamp('2024-03-31')))
+        self.assertEqual(sorted(self.client.translations), ['translation/de', 'translation/es', 'translation/fr'])
+        self.assertEqual(self.store.get_languages_for_ranges(
+            [(timestamp('2024-01-01'), timestamp('2024-03-31'), 'master'),
+             (timestamp('2024-01-01'), timestamp('2024-01-31'), 'master')], ['xwiki-platform', 'xwiki-commons']),
+            [['de', 'es', 'fr'], ['fr']])
+
+        # Nothing is retrieved inside the covered range
+        self.client.change_ranges = []
+        self.client.translations = []
+        self.sync('2024-01-10', '2024-03-10')
+        self.assertEqual(self.client.change_ranges, [])
+        self.assertEqual(self.client.translations, [])
+
+if __name__ == '__main__':
+    unittest.main()